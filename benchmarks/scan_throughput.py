@@ -0,0 +1,155 @@
+"""
+Measure how many scan steps per second pcdsdaq can sustain.
+
+This runs step scans through a ``bluesky`` ``RunEngine`` against
+``pcdsdaq.sim.pydaq`` and ``pcdsdaq.sim.pyami``, with the `Daq` used both as
+a Reader (``count`` over the daq) and as a Flyer (kickoff and complete at
+every step), and reports steps per second, the per-step overhead on top of
+the requested acquisition time, and the peak thread count.
+
+By default the simulated daq is put into its zero-latency mode, so runs end
+as soon as they begin and the numbers measure pcdsdaq itself. Pass
+``--sim-latency`` to keep the simulated acquisition time.
+
+Usage::
+
+    python benchmarks/scan_throughput.py --steps 200 --controls 20 \\
+        --amidets 30 --group
+"""
+import argparse
+import threading
+import time
+
+from bluesky import RunEngine
+from bluesky.plans import count
+from bluesky.plan_stubs import collect, complete, kickoff, trigger_and_read
+from bluesky.preprocessors import run_decorator, stage_decorator
+from ophyd.signal import Signal
+
+import pcdsdaq.daq as daq_module
+import pcdsdaq.sim.pydaq as sim_pydaq
+from pcdsdaq.ami import AmiDet, AmiDetGroup
+from pcdsdaq.daq import Daq
+from pcdsdaq.sim import set_sim_mode
+
+
+class ThreadSampler:
+    """
+    Track the largest ``threading.active_count`` while running.
+    """
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.peak = threading.active_count()
+        self._done = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._done.wait(self.interval):
+            self.peak = max(self.peak, threading.active_count())
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._done.set()
+        self._thread.join()
+
+
+def reader_plan(daq, dets, steps):
+    """
+    Step scan with the daq as a Reader: trigger begins, read stops.
+    """
+    return (yield from count([daq] + dets, num=steps))
+
+
+def flyer_plan(daq, dets, steps):
+    """
+    Step scan with the daq as a Flyer: kickoff and complete every step.
+    """
+    @stage_decorator([daq] + dets)
+    @run_decorator()
+    def inner():
+        for i in range(steps):
+            yield from kickoff(daq, wait=True)
+            yield from trigger_and_read(dets)
+            yield from complete(daq, wait=True)
+            yield from collect(daq)
+    return (yield from inner())
+
+
+def make_dets(num, group):
+    """
+    Make ``num`` sim `AmiDet` objects, in one `AmiDetGroup` if ``group``.
+    """
+    dets = [AmiDet('BENCH{}'.format(i), name='bench{}'.format(i),
+                   normalize=False)
+            for i in range(num)]
+    if group and dets:
+        return [AmiDetGroup(dets, name='bench')]
+    return dets
+
+
+def run_scenario(RE, daq, plan, dets, steps, events, latency):
+    """
+    Run one scan and return steps per second, overhead per step in
+    seconds, and the peak thread count.
+    """
+    acquire_time = events / 120 if latency else 0
+    with ThreadSampler() as sampler:
+        start = time.perf_counter()
+        RE(plan(daq, dets, steps))
+        elapsed = time.perf_counter() - start
+    overhead = (elapsed - steps * acquire_time) / steps
+    return steps / elapsed, overhead, sampler.peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--steps', type=int, default=100)
+    parser.add_argument('--events', type=int, default=1)
+    parser.add_argument('--controls', type=int, default=0,
+                        help='number of controls signals to record')
+    parser.add_argument('--amidets', type=int, default=0,
+                        help='number of AmiDets to read every step')
+    parser.add_argument('--group', action='store_true',
+                        help='read the AmiDets as one AmiDetGroup')
+    parser.add_argument('--modes', nargs='+', default=['reader', 'flyer'],
+                        choices=['reader', 'flyer'])
+    parser.add_argument('--sim-latency', action='store_true',
+                        help='keep the simulated acquisition time')
+    args = parser.parse_args()
+
+    set_sim_mode(True)
+    sim_pydaq.zero_latency = not args.sim_latency
+    daq_module.BEGIN_THROTTLE = 0
+    daq_module.HINTS_FILE = None
+    RE = RunEngine({})
+    daq = Daq(RE=RE)
+    daq.begin_throttle = 0
+    controls = [Signal(name='ctrl{}'.format(i), value=float(i))
+                for i in range(args.controls)]
+    daq.configure(events=args.events, controls=controls or None)
+    dets = make_dets(args.amidets, args.group)
+    plans = dict(reader=reader_plan, flyer=flyer_plan)
+
+    print('{} steps of {} events, {} controls, {} AmiDets{}, sim latency {}'
+          .format(args.steps, args.events, args.controls, args.amidets,
+                  ' (grouped)' if args.group else '',
+                  'on' if args.sim_latency else 'off'))
+    print('{:<8} {:>10} {:>16} {:>8}'.format('mode', 'steps/s',
+                                             'overhead ms', 'threads'))
+    try:
+        for mode in args.modes:
+            rate, overhead, threads = run_scenario(
+                RE, daq, plans[mode], dets, args.steps, args.events,
+                args.sim_latency)
+            print('{:<8} {:>10.1f} {:>16.2f} {:>8}'.format(
+                  mode, rate, 1e3 * overhead, threads))
+    finally:
+        daq.end_run()
+        daq.disconnect()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+Measure the per-step overhead of the `Daq` begin/end cycle.
+
+This drives a `Daq` connected to ``pcdsdaq.sim.pydaq.Control`` through the
+same kickoff/end status cycle that a ``bluesky`` step scan uses and reports
+how long each step takes beyond the requested acquisition time.
+
+The ``--lag`` option makes the simulated daq keep reporting ``Running`` for a
+while after each run ends, like the real daq sometimes does. The ``--poll``
+option swaps in the old wait, which asks the daq for its state every
+``POLL_INTERVAL`` seconds, for comparison.
+
+Usage::
+
+    python benchmarks/step_latency.py --steps 100 --lag 0.3
+    python benchmarks/step_latency.py --steps 100 --lag 0.3 --poll
+"""
+import argparse
+import statistics
+import time
+
+import pcdsdaq.daq as daq_module
+import pcdsdaq.sim.pydaq as sim_pydaq
+from pcdsdaq.daq import Daq
+from pcdsdaq.sim import set_sim_mode
+
+# Seconds between state queries in the --poll wait
+POLL_INTERVAL = 0.1
+
+
+class LaggyControl(sim_pydaq.Control):
+    """
+    Simulated control that reports ``Running`` for ``lag`` seconds after a
+    run has ended.
+    """
+    lag = 0
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stop_time = 0
+
+    def stop(self):
+        super().stop()
+        self._stop_time = time.time()
+
+    def state(self):
+        if self._state == 'Open' and time.time() - self._stop_time < self.lag:
+            return self._all_states.index('Running')
+        return super().state()
+
+
+def poll_for_ready(daq, timeout):
+    """
+    Wait for the daq to stop running by asking it every ``POLL_INTERVAL``
+    seconds, as the begin path did before it waited on state transitions.
+    """
+    deadline = time.time() + timeout
+    while True:
+        state = daq.refresh_state()
+        if state != 'Running' or time.time() >= deadline:
+            return state
+        time.sleep(POLL_INTERVAL)
+
+
+def run_steps(daq, steps, events):
+    """
+    Run ``steps`` begin/end cycles, returning the begin latencies and the
+    step overheads in seconds.
+    """
+    begin_latency = []
+    overhead = []
+    acquire_time = events / 120
+    for i in range(steps):
+        start = time.time()
+        begin_status = daq.kickoff(events=events)
+        begin_status.wait(timeout=30)
+        begun = time.time()
+        end_status = daq._get_end_status()
+        end_status.wait(timeout=30)
+        done = time.time()
+        begin_latency.append(begun - start)
+        overhead.append(done - start - acquire_time)
+    return begin_latency, overhead
+
+
+def summarize(label, values):
+    values = sorted(values)
+    p95 = values[int(0.95 * (len(values) - 1))]
+    print('{:<16} mean {:7.2f} ms  median {:7.2f} ms  p95 {:7.2f} ms'.format(
+          label, 1e3 * statistics.mean(values),
+          1e3 * statistics.median(values), 1e3 * p95))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--steps', type=int, default=50)
+    parser.add_argument('--events', type=int, default=1)
+    parser.add_argument('--lag', type=float, default=0)
+    parser.add_argument('--poll', action='store_true',
+                        help='Poll for the state instead of waiting on '
+                             'transitions')
+    args = parser.parse_args()
+
+    set_sim_mode(True)
+    daq_module.BEGIN_THROTTLE = 0
+    daq_module.HINTS_FILE = None
+    LaggyControl.lag = args.lag
+    sim_pydaq.Control = LaggyControl
+    daq = Daq()
+    if args.poll:
+        daq._wait_for_ready = lambda timeout: poll_for_ready(daq, timeout)
+    daq.configure(events=args.events)
+    try:
+        begin_latency, overhead = run_steps(daq, args.steps, args.events)
+    finally:
+        daq.end_run()
+    print('{} steps of {} events, lag={}s, {}'.format(
+          args.steps, args.events, args.lag,
+          'polling' if args.poll else 'transitions'))
+    summarize('begin latency', begin_latency)
+    summarize('step overhead', overhead)
+
+
+if __name__ == '__main__':
+    main()
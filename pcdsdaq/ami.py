@@ -1,7 +1,11 @@
+import heapq
+import itertools
 import logging
 import time
 from importlib import import_module
-from threading import Thread
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Lock, Thread
 
 import numpy as np
 from ophyd.device import Device, Component as Cpt, Staged
@@ -11,9 +15,17 @@ from ophyd.utils.errors import ReadOnlyError
 from toolz.itertoolz import partition
 
 from .ext_scripts import hutch_name, get_ami_proxy
+from .filters import And, Or, Range, EventCode, parse_filter
 
 logger = logging.getLogger(__name__)
 L3T_DEFAULT = '/reg/neh/operator/{}opr/l3t/amifil.l3t'
+# Triggers with the same min_duration this close together share a status
+TRIGGER_COALESCE = 0.01
+# Idle pyami.Entry objects kept for reuse between scans
+ENTRY_POOL_SIZE = 64
+ENTRY_IDLE_TIMEOUT = 600
+# Threads used by AmiDetGroup to create pyami.Entry objects in parallel
+STAGE_WORKERS = 8
 
 # Set uninitialized globals for style-checker
 pyami = None
@@ -22,6 +34,13 @@ ami_proxy = None
 l3t_file = None
 monitor_det = None
 last_filter_string = None
+entry_pool = None
+_entry_pool_lock = Lock()
+pushed_filter = None
+l3t_push_count = None
+l3t_skip_count = None
+# Marks that we have not pushed an l3t filter yet, distinct from a clear
+_NOT_PUSHED = object()
 
 
 # Define default starting values. Can also use to reset module.
@@ -31,7 +50,11 @@ def _reset_globals():
                     ami_proxy=None,
                     l3t_file=None,
                     monitor_det=None,
-                    last_filter_string=None)
+                    last_filter_string=None,
+                    entry_pool=OrderedDict(),
+                    pushed_filter=_NOT_PUSHED,
+                    l3t_push_count=0,
+                    l3t_skip_count=0)
     globals().update(defaults)
 
 
@@ -73,6 +96,10 @@ def auto_setup_pyami():
         try:
             pyami.connect(ami_proxy)
             globals()['pyami_connected'] = True
+            # A new connection has not seen any of our l3t pushes, and the
+            # pooled entries belong to the old one
+            globals()['pushed_filter'] = _NOT_PUSHED
+            clear_entry_pool()
         except Exception:
             globals()['pyami_connected'] = False
             raise
@@ -88,6 +115,8 @@ def set_pyami_proxy(proxy):
         Either the server name or group number
     """
     globals()['ami_proxy'] = proxy
+    globals()['pushed_filter'] = _NOT_PUSHED
+    clear_entry_pool()
 
 
 def set_l3t_file(l3t_file):
@@ -100,6 +129,7 @@ def set_l3t_file(l3t_file):
         Full file path
     """
     globals()['l3t_file'] = l3t_file
+    globals()['pushed_filter'] = _NOT_PUSHED
 
 
 def set_monitor_det(det):
@@ -121,7 +151,8 @@ def set_monitor_det(det):
         globals()['monitor_det'] = None
 
 
-def set_pyami_filter(*args, event_codes=None, operator='&', or_bykik=False):
+def set_pyami_filter(*args, event_codes=None, operator='&', or_bykik=False,
+                     force=False):
     """
     Set up the l3t filters.
 
@@ -160,16 +191,56 @@ def set_pyami_filter(*args, event_codes=None, operator='&', or_bykik=False):
         False by default, appends an ``or`` condition that marks l3t pass
         when we see the bykik event code. This makes sure the off shots
         make it into the data if we're in l3t veto mode.
+
+    force: ``bool``, optional
+        False by default. Normally we skip the push if the same filter, or
+        the same clear, was the last thing we sent to pyami. Set this to
+        ``True`` to push anyway.
     """
 
     auto_setup_pyami()
     filter_string = dets_filter(*args, event_codes=event_codes,
                                 operator=operator, or_bykik=or_bykik)
+    canonical = canonical_filter(filter_string)
+    if not force and canonical == pushed_filter:
+        logger.debug('Skipping l3t push, filter unchanged: %s', filter_string)
+        globals()['l3t_skip_count'] += 1
+        return
     if filter_string is None:
         pyami.clear_l3t()
     else:
         pyami.set_l3t(filter_string, l3t_file)
         globals()['last_filter_string'] = filter_string
+    globals()['pushed_filter'] = canonical
+    globals()['l3t_push_count'] += 1
+
+
+def canonical_filter(filter_string):
+    """
+    Put a filter string into a form where equivalent filters compare equal.
+
+    Parameters
+    ----------
+    filter_string: ``str``, `Filter`, or ``None``
+        A filter from `dets_filter`, or ``None`` for no filter.
+
+    Returns
+    -------
+    canonical: ``str`` or ``None``
+        The canonical rendering of the filter from `pcdsdaq.filters`, or
+        ``None`` for no filter. Strings we can't parse just have their
+        whitespace removed.
+    """
+    if not filter_string:
+        return None
+    if isinstance(filter_string, str):
+        try:
+            filter_string = parse_filter(filter_string)
+        except ValueError:
+            logger.debug('Could not parse filter %s', filter_string,
+                         exc_info=True)
+            return ''.join(filter_string.split())
+    return filter_string.canonical().render()
 
 
 def dets_filter(*args, event_codes=None, operator='&', or_bykik=True):
@@ -214,9 +285,11 @@ def dets_filter(*args, event_codes=None, operator='&', or_bykik=True):
     Returns
     -------
     filter_string: ``str``
-        A valid filter string for `AmiDet` or for ``pyami.set_l3t``
+        A valid filter string for `AmiDet` or for ``pyami.set_l3t``, in the
+        canonical form from `pcdsdaq.filters`, so the same conditions always
+        give the same string.
     """
-    filter_strings = []
+    terms = []
     if len(args) % 3 == 2:
         # One arg missing, add the monitor det as first arg
         if monitor_det is None:
@@ -231,19 +304,21 @@ def dets_filter(*args, event_codes=None, operator='&', or_bykik=True):
             ami_name = det.prefix
         else:
             raise TypeError('Must use AmiDet or string for filtering!')
-        filter_strings.append(basic_filter(ami_name, lower, upper))
+        terms.append(Range(ami_name, lower, upper))
     if event_codes is not None:
         for code in event_codes:
-            filter_strings.append(evr_filter(code))
-    if len(filter_strings) == 0:
+            terms.append(EventCode(code))
+    if len(terms) == 0:
         return None
+    if operator == '&':
+        filt = And(*terms)
+    elif operator == '|':
+        filt = Or(*terms)
     else:
-        base = concat_filter_strings(filter_strings, operator=operator)
-        if or_bykik:
-            bykik = evr_filter(162)
-            return concat_filter_strings([base, bykik], operator='|')
-        else:
-            return base
+        raise ValueError('operator must be & or |, got {}'.format(operator))
+    if or_bykik:
+        filt = Or(filt, EventCode(162))
+    return filt.canonical().render()
 
 
 def basic_filter(ami_name, lower, upper):
@@ -265,7 +340,7 @@ def basic_filter(ami_name, lower, upper):
     -------
     filter_string: ``str``
     """
-    return '{}<{}<{}'.format(lower, ami_name, upper)
+    return Range(ami_name, lower, upper).render()
 
 
 def evr_filter(event_code):
@@ -281,8 +356,7 @@ def evr_filter(event_code):
     -------
     filter_string: ``str``
     """
-    evr_base = 'DAQ:EVR:Evt{}'
-    return basic_filter(evr_base.format(event_code), 0.1, 2)
+    return EventCode(event_code).render()
 
 
 def concat_filter_strings(filter_strings, operator='&'):
@@ -307,6 +381,195 @@ def concat_filter_strings(filter_strings, operator='&'):
         return '(' + sep.join(filter_strings) + ')'
 
 
+class _DurationTimer:
+    """
+    One thread that finishes the ``min_duration`` statuses of every `AmiDet`.
+
+    Requests for the same duration that arrive within `TRIGGER_COALESCE`
+    seconds of each other share one status. The shared deadline is pushed
+    back to the latest request so no detector is cut short.
+    """
+    def __init__(self):
+        self._cond = Condition()
+        self._heap = []
+        self._pending = {}
+        self._seq = itertools.count()
+        self._thread = None
+
+    def status(self, duration):
+        """
+        Get a status that will be marked done after ``duration`` seconds.
+        """
+        with self._cond:
+            now = time.monotonic()
+            deadline = now + duration
+            timer = self._pending.get(duration)
+            if timer is not None and now - timer['start'] <= TRIGGER_COALESCE:
+                timer['deadline'] = deadline
+                return timer['status']
+            timer = dict(start=now, deadline=deadline, duration=duration,
+                         status=Status())
+            self._pending[duration] = timer
+            heapq.heappush(self._heap, (deadline, next(self._seq), timer))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name='ami_timer',
+                                      daemon=True)
+                self._thread.start()
+            self._cond.notify()
+            return timer['status']
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    if not self._heap:
+                        self._cond.wait()
+                        continue
+                    deadline, _, timer = self._heap[0]
+                    wait = deadline - time.monotonic()
+                    if wait > 0:
+                        self._cond.wait(wait)
+                        continue
+                    heapq.heappop(self._heap)
+                    if timer['deadline'] > deadline:
+                        # Another trigger joined and pushed the deadline back
+                        heapq.heappush(self._heap, (timer['deadline'],
+                                                    next(self._seq), timer))
+                        continue
+                    if self._pending.get(timer['duration']) is timer:
+                        del self._pending[timer['duration']]
+                    break
+            timer['status'].set_finished()
+
+
+_timer = _DurationTimer()
+
+
+def duration_status(duration):
+    """
+    Get a status that will be marked done after ``duration`` seconds.
+
+    All of these statuses are finished from one shared timer thread, and
+    calls with the same ``duration`` within `TRIGGER_COALESCE` seconds of
+    each other get the same status object.
+
+    Parameters
+    ----------
+    duration: ``float``
+        The number of seconds to wait. If zero, the status is marked done
+        right away.
+
+    Returns
+    -------
+    status: ``Status``
+    """
+    if not duration:
+        status = Status()
+        status.set_finished()
+        return status
+    return _timer.status(duration)
+
+
+def _entry_key(prefix, ami_type, filter_string):
+    return (prefix, ami_type, canonical_filter(filter_string))
+
+
+def checkout_entry(prefix, ami_type='Scalar', filter_string=None):
+    """
+    Get a cleared pyami.Entry, reusing an idle one from the pool if we can.
+
+    Creating a pyami.Entry registers a new accumulator with the ami server,
+    so entries are kept in a pool between scans and handed back out for the
+    same ``(prefix, ami_type, filter_string)``.
+
+    Parameters
+    ----------
+    prefix: ``str``
+        The ami name.
+
+    ami_type: ``str``, optional
+        The ami entry type.
+
+    filter_string: ``str``, optional
+        The filter to apply to the entry, or a falsy value for no filter.
+
+    Returns
+    -------
+    entry: ``pyami.Entry``
+    """
+    key = _entry_key(prefix, ami_type, filter_string)
+    entry = None
+    with _entry_pool_lock:
+        _evict_entries()
+        idle = entry_pool.get(key)
+        if idle:
+            entry, _ = idle.pop()
+            if not idle:
+                del entry_pool[key]
+    if entry is None:
+        logger.debug('Creating pyami.Entry for %s', key)
+        if filter_string:
+            entry = pyami.Entry(prefix, ami_type, str(filter_string))
+        else:
+            entry = pyami.Entry(prefix, ami_type)
+    else:
+        logger.debug('Reusing pyami.Entry for %s', key)
+        entry.clear()
+    return entry
+
+
+def checkin_entry(entry, prefix, ami_type='Scalar', filter_string=None):
+    """
+    Return a pyami.Entry from `checkout_entry` to the pool.
+
+    Parameters
+    ----------
+    entry: ``pyami.Entry``
+        The entry to return.
+
+    prefix, ami_type, filter_string:
+        The same arguments that were passed to `checkout_entry`.
+    """
+    key = _entry_key(prefix, ami_type, filter_string)
+    with _entry_pool_lock:
+        idle = entry_pool.pop(key, [])
+        idle.append((entry, time.monotonic()))
+        # Most recently used keys at the end
+        entry_pool[key] = idle
+        _evict_entries()
+
+
+def _evict_entries():
+    """
+    Drop idle entries past the timeout, then the oldest past the size limit.
+
+    Must be called with ``_entry_pool_lock`` held.
+    """
+    cutoff = time.monotonic() - ENTRY_IDLE_TIMEOUT
+    count = 0
+    for key in list(entry_pool):
+        idle = [item for item in entry_pool[key] if item[1] > cutoff]
+        if idle:
+            entry_pool[key] = idle
+            count += len(idle)
+        else:
+            del entry_pool[key]
+    while count > ENTRY_POOL_SIZE:
+        key, idle = next(iter(entry_pool.items()))
+        idle.pop(0)
+        if not idle:
+            del entry_pool[key]
+        count -= 1
+
+
+def clear_entry_pool():
+    """
+    Drop every idle pyami.Entry in the pool.
+    """
+    with _entry_pool_lock:
+        entry_pool.clear()
+
+
 class AmiDet(Device):
     """
     Detector that gets data from pyami scalars.
@@ -358,7 +621,11 @@ class AmiDet(Device):
                  normalize=True):
         auto_setup_pyami()
         self._entry = None
+        self._entry_filter = None
+        self._stage_lock = Lock()
+        self._snapshot = None
         self._monitor = None
+        self._staged_monitor = None
         self.filter_string = filter_string
         self.min_duration = min_duration
         self.normalize = normalize
@@ -375,37 +642,69 @@ class AmiDet(Device):
         have no effect.
 
         Internally this creates a new pyami.Entry object. These objects start
-        accumulating data immediately.
+        accumulating data immediately. Entries are reused from the pool in
+        `checkout_entry` when one with the same filter is idle.
+
+        If there is a normalization detector in use and it has not been staged,
+        it will be staged here too, and `unstage` will unstage it again. If
+        this detector was already staged as another detector's monitor, this
+        does nothing.
         """
-        if self.filter_string is None and last_filter_string is not None:
-            self._entry = pyami.Entry(self.prefix, 'Scalar',
-                                      last_filter_string)
-        elif self.filter_string:
-            self._entry = pyami.Entry(self.prefix, 'Scalar',
-                                      self.filter_string)
-        else:
-            self._entry = pyami.Entry(self.prefix, 'Scalar')
-        if self.normalize:
-            if isinstance(self.normalize, AmiDet):
-                self._monitor = self.normalize
+        with self._stage_lock:
+            if self._staged == Staged.yes and self._entry is not None:
+                return [self]
+            if (self.filter_string is None
+                    and last_filter_string is not None):
+                filter_string = last_filter_string
             else:
-                self._monitor = monitor_det
+                filter_string = self.filter_string
+            if self._entry is not None:
+                checkin_entry(self._entry, self.prefix, 'Scalar',
+                              self._entry_filter)
+            self._entry = checkout_entry(self.prefix, 'Scalar',
+                                         filter_string)
+            self._entry_filter = filter_string
+            self._monitor = self._resolve_monitor()
+            self._staged_monitor = None
+            staged = []
             if self._monitor is not None:
                 self.mon_prefix.put(self._monitor.prefix)
-        return super().stage()
+                if (self._monitor is not self
+                        and self._monitor._staged != Staged.yes):
+                    staged = self._monitor.stage()
+                    self._staged_monitor = self._monitor
+            return super().stage() + staged
+
+    def _resolve_monitor(self):
+        """
+        Pick the detector to normalize to, or ``None`` for no normalization.
+        """
+        if not self.normalize:
+            return None
+        elif isinstance(self.normalize, AmiDet):
+            return self.normalize
+        else:
+            return monitor_det
 
     def unstage(self):
         """
         Called late in a bluesky scan to remove the pyami.Entry object and the
-        monitor.
+        monitor, if `stage` staged it. The entry goes back into the pool for
+        the next scan.
         """
+        if self._entry is not None:
+            checkin_entry(self._entry, self.prefix, 'Scalar',
+                          self._entry_filter)
         self._entry = None
-        if self._monitor is not None and self._monitor is not self:
-            self._monitor.unstage()
-            unstaged = super().unstage() + [self._monitor]
+        self._snapshot = None
+        monitor = self._staged_monitor
+        if monitor is not None and monitor._staged == Staged.yes:
+            monitor.unstage()
+            unstaged = super().unstage() + [monitor]
         else:
             unstaged = super().unstage()
         self._monitor = None
+        self._staged_monitor = None
         self.mon_prefix.put('')
         return unstaged
 
@@ -420,65 +719,46 @@ class AmiDet(Device):
 
         If min_duration is zero, this will return a status already marked done
         and successful. Otherwise, this will return a status that will be
-        marked done after min_duration seconds.
-
-        If there is a normalization detector in use and it has not been staged,
-        it will be staged during the first trigger in a scan.
+        marked done after min_duration seconds. Detectors triggered together
+        with the same min_duration share this status.
         """
         if self._entry is None:
             raise RuntimeError('AmiDet %s(%s) was never staged!', self.name,
                                self.prefix)
         if self._monitor is not None and self._monitor is not self:
-            if self._monitor._staged != Staged.yes:
-                self._monitor.unstage()
-                self._monitor.stage()
             monitor_status = self._monitor.trigger()
         else:
             monitor_status = None
         self._entry.clear()
-        if self.min_duration:
-            def inner(duration, status):
-                time.sleep(duration)
-                status.set_finished()
-            status = Status(obj=self)
-            Thread(target=inner, args=(self.min_duration, status)).start()
-        else:
-            status = Status(obj=self)
-            status.set_finished()
+        self._snapshot = None
+        status = duration_status(self.min_duration)
         if monitor_status is None:
             return status
         else:
             return status & monitor_status
 
     def get(self, *args, **kwargs):
-        self._get_data()
+        self._get_data(fresh=True)
         return super().get(*args, **kwargs)
 
     def read(self, *args, **kwargs):
         self._get_data()
         return super().read(*args, **kwargs)
 
-    def _get_data(self):
+    def _get_data(self, fresh=False):
         """
         Helper function that stuffs ami data into this device's signals.
 
         Parameters
         ----------
-        del_entry: ``bool``
-            If ``True``, we'll clear the accumulated data after getting it.
+        fresh: ``bool``
+            If ``True``, we'll take new snapshots of this detector and its
+            monitor instead of reusing the ones from this read cycle.
         """
-        if self._entry is None:
-            raise RuntimeError('Must stage AmiDet to begin accumulating data')
-
-        data = self._entry.get()
+        data = self._entry_data(fresh=fresh)
         self.mean_raw.put(data['mean'])
         self.rms.put(data['rms'])
         self.entries.put(data['entries'])
-        # Calculate the standard error because old python did
-        if data['entries']:
-            data['err'] = data['rms']/np.sqrt(data['entries'])
-        else:
-            data['err'] = 0
         self.err_raw.put(data['err'])
 
         def adj_error(det_mean, det_err, mon_mean, mon_err):
@@ -501,18 +781,50 @@ class AmiDet(Device):
             self.err_mon.put(data['err'])
             self.entries_mon.put(data['entries'])
         else:
-            mon_data = self._monitor.get()
-            if mon_data.mean_raw == 0:
+            mon_data = self._monitor._entry_data(fresh=fresh)
+            if mon_data['mean'] == 0:
                 self.mean.put(np.nan)
                 self.err.put(np.nan)
             else:
-                self.mean.put(data['mean']/mon_data.mean_raw)
+                self.mean.put(data['mean']/mon_data['mean'])
                 self.err.put(adj_error(data['mean'], data['err'],
-                                       mon_data.mean_raw,
-                                       mon_data.err_raw))
-            self.mean_mon.put(mon_data.mean_raw)
-            self.err_mon.put(mon_data.err_raw)
-            self.entries_mon.put(mon_data.entries)
+                                       mon_data['mean'],
+                                       mon_data['err']))
+            self.mean_mon.put(mon_data['mean'])
+            self.err_mon.put(mon_data['err'])
+            self.entries_mon.put(mon_data['entries'])
+
+    def _entry_data(self, fresh=False):
+        """
+        Get a snapshot of the accumulated pyami data.
+
+        The snapshot is taken the first time it is needed after a `trigger`
+        and is shared by every detector that reads it until the next
+        `trigger`, so all detectors normalized to the same monitor in one
+        event see the same monitor data.
+
+        Parameters
+        ----------
+        fresh: ``bool``
+            If ``True``, always take a new snapshot.
+
+        Returns
+        -------
+        data: ``dict``
+            The ``mean``, ``rms``, and ``entries`` from ``pyami``, along with
+            the standard error as ``err``.
+        """
+        if self._entry is None:
+            raise RuntimeError('Must stage AmiDet to begin accumulating data')
+        if fresh or self._snapshot is None:
+            data = dict(self._entry.get())
+            # Calculate the standard error because old python did
+            if data['entries']:
+                data['err'] = data['rms']/np.sqrt(data['entries'])
+            else:
+                data['err'] = 0
+            self._snapshot = data
+        return self._snapshot
 
     def put(self, *args, **kwargs):
         raise ReadOnlyError('AmiDet is read-only')
@@ -549,3 +861,209 @@ class AmiDet(Device):
         else:
             self.filter_string = dets_filter(*args, event_codes=event_codes,
                                              operator=operator)
+
+
+class AmiDetGroup:
+    """
+    Read many `AmiDet` objects as one detector.
+
+    Each member still owns its own pyami.Entry, but the group fetches every
+    entry in one pass per event and does the error and normalization math
+    as array operations across all of the members, instead of running the
+    scalar math and signal puts once per detector. The data keys are the
+    same as the ones the members would have put into the event on their
+    own.
+
+    Parameters
+    ----------
+    dets: ``list`` of `AmiDet`
+        The detectors to read together.
+
+    name: ``str``, required keyword
+        The name of the group.
+
+    min_duration: ``float``, optional
+        If provided, we'll wait this many seconds before declaring the
+        acquisition as complete. The longest ``min_duration`` of the group
+        and its members is used.
+    """
+    parent = None
+
+    def __init__(self, dets, *, name, min_duration=0):
+        self.dets = list(dets)
+        self.name = name
+        self.min_duration = min_duration
+        self._monitors = []
+        self._mon_index = None
+        self._self_mon = None
+        self._staged_dets = []
+        self._staged_monitors = []
+
+    @property
+    def hints(self):
+        fields = []
+        for det in self.dets:
+            fields.extend(det.hints['fields'])
+        return {'fields': fields}
+
+    def stage(self):
+        """
+        Stage all of the members and any monitors they normalize to.
+
+        The pyami.Entry objects are created concurrently, first for the
+        monitors and then for the remaining members, so every entry exists
+        before the first trigger.
+
+        Returns
+        -------
+        staged: ``list``
+            list of devices staged
+        """
+        monitors = []
+        for det in self.dets:
+            mon = det._resolve_monitor()
+            if mon is not None and mon is not det and mon not in monitors:
+                monitors.append(mon)
+        first = [mon for mon in monitors if mon._staged != Staged.yes]
+        rest = [det for det in self.dets
+                if det not in monitors and det._staged != Staged.yes]
+        staged = []
+        try:
+            with ThreadPoolExecutor(max_workers=STAGE_WORKERS,
+                                    thread_name_prefix='ami_stage') as pool:
+                for batch in (first, rest):
+                    futures = [pool.submit(det.stage) for det in batch]
+                    for future in futures:
+                        for dev in future.result():
+                            if dev not in staged:
+                                staged.append(dev)
+        except Exception:
+            for det in reversed(first + rest):
+                if det._staged == Staged.yes:
+                    det.unstage()
+            raise
+        self._staged_dets = [det for det in self.dets
+                             if det in first or det in rest]
+        self._staged_monitors = [mon for mon in first
+                                 if mon not in self.dets]
+        self._monitors = [mon for mon in monitors if mon not in self.dets]
+        monitors = self._monitors
+
+        # Index of each member's monitor in the stacked entries, -1 for none
+        sources = self.dets + monitors
+        self._mon_index = np.array([-1 if det._monitor is None
+                                    else sources.index(det._monitor)
+                                    for det in self.dets], dtype=int)
+        self._self_mon = np.array([det._monitor is det for det in self.dets],
+                                  dtype=bool)
+        return staged + [self]
+
+    def unstage(self):
+        """
+        Unstage the members and monitors that `stage` staged.
+
+        Returns
+        -------
+        unstaged: ``list``
+            list of devices unstaged
+        """
+        unstaged = []
+        for det in self._staged_dets + self._staged_monitors:
+            if det._staged == Staged.yes:
+                for dev in det.unstage():
+                    if dev not in unstaged:
+                        unstaged.append(dev)
+        self._staged_dets = []
+        self._staged_monitors = []
+        self._monitors = []
+        self._mon_index = None
+        self._self_mon = None
+        return unstaged + [self]
+
+    def trigger(self):
+        """
+        Clear the accumulated pyami data of every member and monitor.
+
+        Returns
+        -------
+        status: ``Status``
+            Marked done after the longest ``min_duration``.
+        """
+        if self._mon_index is None:
+            raise RuntimeError('AmiDetGroup %s was never staged!', self.name)
+        for det in self.dets + self._monitors:
+            det._entry.clear()
+            det._snapshot = None
+        duration = max([self.min_duration]
+                       + [det.min_duration for det in self.dets])
+        return duration_status(duration)
+
+    def read(self):
+        """
+        Fetch every entry once and return the data for all of the members.
+
+        Returns
+        -------
+        data: ``dict``
+            Mapping of each member's data key to value and timestamp.
+        """
+        if self._mon_index is None:
+            raise RuntimeError('Must stage AmiDetGroup to begin accumulating '
+                               'data')
+        sources = self.dets + self._monitors
+        raw = [det._entry.get() for det in sources]
+        mean = np.array([data['mean'] for data in raw], dtype=float)
+        rms = np.array([data['rms'] for data in raw], dtype=float)
+        entries = np.array([data['entries'] for data in raw], dtype=int)
+        err = np.zeros_like(mean)
+        np.divide(rms, np.sqrt(entries), out=err, where=entries > 0)
+
+        num = len(self.dets)
+        det_mean = mean[:num]
+        det_err = err[:num]
+        has_mon = self._mon_index >= 0
+        mon_index = np.where(has_mon, self._mon_index, 0)
+        mon_mean = np.where(has_mon, mean[mon_index], 0.)
+        mon_err = np.where(has_mon, err[mon_index], 0.)
+        mon_entries = np.where(has_mon, entries[mon_index], 0)
+
+        nonzero = mon_mean != 0
+        norm_mean = np.full(num, np.nan)
+        np.divide(det_mean, mon_mean, out=norm_mean, where=nonzero)
+        norm_mean[self._self_mon] = 1
+        norm_err = np.full(num, np.nan)
+        np.divide(det_err, mon_mean, out=norm_err, where=nonzero)
+        ratio_sq = np.zeros(num)
+        np.divide(det_mean, mon_mean, out=ratio_sq, where=nonzero)
+        norm_err += mon_err * ratio_sq**2
+        out_mean = np.where(has_mon, norm_mean, det_mean)
+        out_err = np.where(has_mon, norm_err, det_err)
+
+        ts = time.time()
+        values = dict(mean=out_mean, err=out_err, entries=entries[:num],
+                      mean_raw=det_mean, err_raw=det_err,
+                      mean_mon=mon_mean, err_mon=mon_err,
+                      entries_mon=mon_entries)
+        data = {}
+        for i, det in enumerate(self.dets):
+            for attr, arr in values.items():
+                data[getattr(det, attr).name] = {'value': arr[i].item(),
+                                                 'timestamp': ts}
+            data[det.mon_prefix.name] = {'value': det.mon_prefix.get(),
+                                         'timestamp': ts}
+        return data
+
+    def describe(self):
+        """
+        Explain what read returns, using the members' own descriptions.
+        """
+        desc = {}
+        for det in self.dets:
+            desc.update(det.describe())
+        return desc
+
+    def read_configuration(self):
+        return {}
+
+    def describe_configuration(self):
+        return {}
@@ -1,15 +1,23 @@
 """
 This module defines a control interface for the LCLS1 DAQ.
 """
+import asyncio
+import contextlib
 import enum
 import functools
+import json
 import logging
 import os
 import time
 import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from importlib import import_module
 
-from ophyd.status import Status
+import numpy as np
+from ophyd.status import AndStatus, Status
 from ophyd.utils import StatusTimeoutError, WaitTimeoutError
 
 from . import ext_scripts
@@ -20,8 +28,30 @@ pydaq = None
 
 # Wait up to this many seconds for daq to be ready for a begin call
 BEGIN_TIMEOUT = 15
-# Do not allow begins within this many seconds of a stop
+# Do not allow begins within this many seconds of a stop. The learned
+# throttle in Daq.begin_throttle never goes above this.
 BEGIN_THROTTLE = 1
+# Lower the learned throttle after this many good early begins in a row
+THROTTLE_STREAK = 10
+# Lower the learned throttle by this factor each time
+THROTTLE_DECREASE = 0.8
+# Keep the learned throttle this many times above the latest failed begin
+THROTTLE_MARGIN = 1.5
+# Reuse the last known daq state for this many seconds before asking again
+STATE_CACHE_TIMEOUT = 0.1
+# The daq platforms to look for when connecting
+PLATFORMS = range(6)
+# Give the platform that worked last time this many seconds on its own
+# before trying all of the platforms at once
+CONNECT_HINT_TIMEOUT = 2
+# Give up on reading a controls device after this many seconds
+CONTROLS_TIMEOUT = 5
+# Read controls devices directly if they have not updated in this many seconds
+CONTROLS_STALE_TIME = 60
+# Per-host notes about the daq that persist between sessions. None to disable.
+HINTS_FILE = os.path.join(os.path.expanduser('~'), '.pcdsdaq_hints.json')
+# Keep this many of the most recent phase timings for Daq.timing_report
+TIMING_HISTORY = 10000
 
 # Not-None sentinal for default value when None has a special meaning
 # Indicates that the last configured value should be used
@@ -74,6 +104,23 @@ class Daq:
     ----------
     RE: ``RunEngine``, optional
         Set ``RE`` to the session's main ``RunEngine``
+
+    pipeline: ``bool``, optional
+        If ``True``, the ``controls`` values for each begin are read in the
+        background as soon as `kickoff` is called, while we are still stopping
+        the previous acquisition, waiting for the daq to be ready, and waiting
+        for any earlier daq requests to finish. The begin then only has to
+        send the prepared arguments. Defaults to
+        ``False``, which reads the ``controls`` right before the begin.
+
+    platform: ``int``, optional
+        Only connect to this daq platform. By default, every platform in
+        ``PLATFORMS`` is tried. Set this to run several `Daq` objects against
+        different platforms in one session.
+
+    name: ``str``, optional
+        The ``bluesky`` name of this daq, and its key in the registry used by
+        `get_daq` and `get_daqs`. Defaults to ``'daq'``.
     """
     _state_enum = enum.Enum('PydaqState',
                             'Disconnected Connected Configured Open Running',
@@ -87,13 +134,25 @@ class Daq:
     name = 'daq'
     parent = None
 
-    def __init__(self, RE=None):
+    def __init__(self, RE=None, pipeline=False, platform=None, name='daq'):
         if pydaq is None:
             globals()['pydaq'] = import_module('pydaq')
         super().__init__()
+        self.name = name
+        self.platform = platform
         self._control = None
         self._config = None
         self._desired_config = {}
+        # Notified on every state transition we learn about
+        self._state_cond = threading.Condition()
+        self._state_cache = None
+        self._state_ts = 0
+        self._state_gen = 0
+        # False if the cached state came from a transition, not from the daq
+        self._state_verified = False
+        self._listener_lock = threading.Lock()
+        self._listener_gen = 0
+        self._state_listeners = []
         self._reset_begin()
         self._host = os.uname()[1]
         self._RE = RE
@@ -102,7 +161,32 @@ class Daq:
         self._update_config_ts()
         self._pre_run_state = None
         self._last_stop = 0
+        self._throttle = _BeginThrottle()
         self._check_run_number_has_failed = False
+        # Our best guess at the last run number, see _advance_run_number
+        self._last_run = None
+        # The number of recorded runs we have begun, for seeding _last_run
+        self._runs_begun = 0
+        self._run_number_lock = threading.Lock()
+        self._run_number_pending = False
+        self._run_number_worker = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='daq_run_number')
+        # Runs begin and end requests in order, one at a time
+        self._worker = ThreadPoolExecutor(max_workers=1,
+                                          thread_name_prefix='daq_worker')
+        # Runs the blocking calls behind the async methods
+        self._async_worker = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='daq_async')
+        # Prepares begin arguments ahead of time in pipeline mode
+        self.pipeline = pipeline
+        self._prefetch = ThreadPoolExecutor(max_workers=1,
+                                            thread_name_prefix='daq_prefetch')
+        # Latest values from the configured controls devices, by device id
+        self._ctrl_subs = {}
+        self._ctrl_cache = {}
+        # Recent (phase, start, duration) tuples, see timing_report
+        self._timings = deque(maxlen=TIMING_HISTORY)
+        self.timing_hook = None
         register_daq(self)
 
     # Convenience properties
@@ -151,52 +235,267 @@ class Daq:
         - ``Configured``:   Connected, and the daq has been configured
         - ``Open``:         We are in the middle of a run
         - ``Running``:      We are collecting data in a run
+
+        This is cached for up to ``STATE_CACHE_TIMEOUT`` seconds, and is
+        updated directly by the transitions that this object requests. Use
+        `refresh_state` if you need to ask the daq right now.
+        """
+        if self.connected:
+            with self._state_cond:
+                age = time.time() - self._state_ts
+                if self._state_cache is not None and age < STATE_CACHE_TIMEOUT:
+                    return self._state_cache
+            return self.refresh_state()
+        else:
+            return 'Disconnected'
+
+    def refresh_state(self):
+        """
+        Ask the daq for its state, skipping the cached value.
+
+        Returns
+        -------
+        state: ``str``
+            The current state, as described in `state`.
         """
         if self.connected:
+            query_ts = time.time()
             logger.debug('calling Daq.control.state()')
             num = self._control.state()
-            return self._state_enum(num).name
+            state = self._state_enum(num).name
+            self._set_state(state, timestamp=query_ts)
+            return state
         else:
+            self._clear_state()
             return 'Disconnected'
 
+    def _set_state(self, state, timestamp=None):
+        """
+        Update the cached state.
+
+        Values with a timestamp older than the cached value are discarded,
+        so that a slow query cannot clobber a transition we just requested.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        update = None
+        with self._state_cond:
+            if timestamp >= self._state_ts:
+                changed = state != self._state_cache
+                self._state_cache = state
+                self._state_ts = timestamp
+                self._state_verified = True
+                if changed:
+                    update = self._notify_transition()
+        if update is not None:
+            self._notify_listeners(update)
+
+    def _clear_state(self):
+        """
+        Forget the cached state so that the next check will ask the daq.
+        """
+        with self._state_cond:
+            self._state_cache = None
+            self._state_ts = 0
+            update = self._notify_transition()
+        self._notify_listeners(update)
+
+    def _transition_state(self, from_states, state):
+        """
+        Update the cached state for a transition that only applies if we were
+        in one of ``from_states``. Otherwise, the daq ignores the request.
+
+        The daq can take a moment to report the new state, so `_wait_for_ready`
+        checks with the daq before it trusts the result.
+        """
+        with self._state_cond:
+            if self._state_cache in from_states:
+                self._state_cache = state
+                self._state_ts = time.time()
+                self._state_verified = False
+            update = self._notify_transition()
+        self._notify_listeners(update)
+
+    def _notify_transition(self):
+        """
+        Wake up everything waiting in `_wait_for_ready`.
+
+        Must be called while holding ``_state_cond``. Pass the return value
+        to `_notify_listeners` once ``_state_cond`` is released.
+        """
+        self._state_gen += 1
+        self._state_cond.notify_all()
+        return self._state_gen, self._state_cache
+
+    def _notify_listeners(self, update):
+        """
+        Tell every `state_stream` about an update from `_notify_transition`.
+
+        Updates older than the last one delivered are skipped, so listeners
+        see the states in order. Listeners that raise are dropped, e.g. if
+        their event loop has been closed.
+        """
+        gen, state = update
+        with self._listener_lock:
+            if gen <= self._listener_gen:
+                return
+            self._listener_gen = gen
+            for listener in list(self._state_listeners):
+                try:
+                    listener(state)
+                except Exception:
+                    logger.debug('Dropping state listener %s', listener,
+                                 exc_info=True)
+                    self._state_listeners.remove(listener)
+
+    def _wait_for_ready(self, timeout):
+        """
+        Block until the daq is no longer running, or until ``timeout``.
+
+        This wakes up as soon as we learn about a transition, either from a
+        transition we requested or from a finished ``end`` call. A state we
+        assumed from a requested transition is confirmed with the daq first,
+        since the daq can keep reporting ``Running`` for a moment after a run
+        ends. In case the daq changes state on its own, we also check again
+        whenever the cached state expires.
+
+        Returns
+        -------
+        state: ``str``
+            The last state we saw.
+        """
+        deadline = time.time() + timeout
+        while True:
+            with self._state_cond:
+                gen = self._state_gen
+                verified = self._state_verified
+            if verified:
+                state = self.state
+            else:
+                state = self.refresh_state()
+            remaining = deadline - time.time()
+            if state != 'Running' or remaining <= 0:
+                return state
+            with self._state_cond:
+                if gen == self._state_gen:
+                    self._state_cond.wait(min(remaining,
+                                              STATE_CACHE_TIMEOUT))
+
     # Interactive methods
     def connect(self):
         """
         Connect to the live DAQ, giving full control to the Python process.
 
+        The platform that worked last time on this host is tried first. If
+        that does not connect, all platforms are tried at once and the lowest
+        platform that connects is used. If this `Daq` was made with a
+        ``platform``, only that one is tried.
+
         To undo this, you may call `disconnect`.
         """
         logger.debug('Daq.connect()')
-        err = False
-        conn = False
         if self._control is None:
-            for plat in range(6):
-                try:
-                    logger.debug(('instantiate Daq.control '
-                                  '= pydaq.Control(%s, %s)'),
-                                 self._host, plat)
-                    self._control = pydaq.Control(self._host, platform=plat)
-                    logger.debug('Daq.control.connect()')
-                    self._control.connect()
-                    logger.info('Connected to DAQ')
-                    conn = True
-                    break
-                except Exception as exc:
-                    if 'query' in str(exc):
-                        err = True
-                        logger.error(('Failed to connect: DAQ is not '
-                                      'allocated!'))
-            if not (err or conn):
-                err = True
-                logger.error(('Failed to connect: DAQ is not running on this '
-                              'machine, and is not allocated!'))
-            if err:
-                logger.debug('del Daq.control')
-                del self._control
-                self._control = None
+            platforms = list(PLATFORMS)
+            hints = load_hints(self._host)
+            self._throttle.load(hints)
+            if self.platform is None:
+                hint = hints.get('platform')
+            else:
+                # Don't replace the hint used by the unpinned daq
+                platforms = [self.platform]
+                hint = self.platform
+            plat, control, errors = self._probe_platforms(platforms, hint)
+            if control is None:
+                if any('query' in str(exc) for exc in errors):
+                    logger.error('Failed to connect: DAQ is not allocated!')
+                else:
+                    logger.error(('Failed to connect: DAQ is not running on '
+                                  'this machine, and is not allocated!'))
+            else:
+                self._control = control
+                self._clear_state()
+                logger.info('Connected to DAQ')
+                if plat != hint:
+                    save_hints(self._host, platform=plat)
         else:
             logger.info('Connect requested, but already connected to DAQ')
 
+    def _probe_platforms(self, platforms, hint=None):
+        """
+        Connect to the hinted platform, or else to the lowest platform we can.
+
+        The ``hint`` platform gets ``CONNECT_HINT_TIMEOUT`` seconds on its
+        own. If it does not connect in that time, the rest of the platforms
+        are tried in parallel, and we pick the lowest platform that connects,
+        the same one that trying them in order would find. Every other
+        connection is disconnected once it finishes.
+
+        Returns
+        -------
+        platform, control, errors: ``tuple``
+            The winning platform and its ``pydaq.Control``, or ``None`` for
+            both if no platform connected, and a list of the exceptions raised
+            by the failed platforms.
+        """
+        futures = {}
+        errors = []
+        if hint in platforms:
+            future = self._start_connect(hint)
+            try:
+                control = future.result(timeout=CONNECT_HINT_TIMEOUT)
+            except FutureTimeoutError:
+                logger.debug('Platform %s is slow to connect, trying all '
+                             'platforms', hint)
+                futures[hint] = future
+            except Exception as exc:
+                logger.debug('Platform %s failed to connect: %s', hint, exc)
+                errors.append(exc)
+            else:
+                return hint, control, errors
+        for plat in platforms:
+            if plat != hint:
+                futures[plat] = self._start_connect(plat)
+        winner = None
+        try:
+            for plat in sorted(futures):
+                exc = futures[plat].exception()
+                if exc is None:
+                    winner = plat
+                    break
+                logger.debug('Platform %s failed to connect: %s', plat, exc)
+                errors.append(exc)
+        finally:
+            for plat, future in futures.items():
+                if plat != winner:
+                    future.cancel()
+                    future.add_done_callback(_disconnect_loser)
+        if winner is None:
+            return None, None, errors
+        else:
+            return winner, futures[winner].result(), errors
+
+    def _start_connect(self, platform):
+        """
+        Start `_connect_platform` in a daemon thread and return its future.
+
+        A daemon thread is used so that a platform that never answers cannot
+        hold up the interpreter at exit.
+        """
+        return _daemon_future(self._connect_platform, platform,
+                              name='daq_connect_{}'.format(platform))
+
+    def _connect_platform(self, platform):
+        """
+        Connect to one daq platform, returning the ``pydaq.Control``.
+        """
+        logger.debug('instantiate pydaq.Control(%s, %s)',
+                     self._host, platform)
+        control = pydaq.Control(self._host, platform=platform)
+        logger.debug('pydaq.Control(%s, %s).connect()',
+                     self._host, platform)
+        control.connect()
+        return control
+
     def disconnect(self):
         """
         Disconnect from the live DAQ, giving control back to the GUI.
@@ -209,6 +508,8 @@ class Daq:
             self._control.disconnect()
         del self._control
         self._control = None
+        self._clear_state()
+        self._subscribe_controls(None)
         self._desired_config = self._config or {}
         self._config = None
         logger.info('DAQ is disconnected.')
@@ -302,7 +603,8 @@ class Daq:
             # In some daq configurations the begin status returns very early,
             # so we allow the user to configure an emperically derived extra
             # sleep.
-            time.sleep(self.config['begin_sleep'])
+            with self._timed('begin_sleep'):
+                time.sleep(self.config['begin_sleep'])
             if wait:
                 self.wait()
                 if end_run:
@@ -320,7 +622,26 @@ class Daq:
 
     @property
     def _begin_timeout(self):
-        return BEGIN_TIMEOUT + BEGIN_THROTTLE
+        return BEGIN_TIMEOUT + max(BEGIN_THROTTLE, self.begin_throttle)
+
+    @property
+    def begin_throttle(self):
+        """
+        The minimum time in seconds between a stop and the next begin.
+
+        By default, this is learned from how the daq handles early begins and
+        is saved for the next session on this host. The learned value never
+        goes above ``BEGIN_THROTTLE``. A begin that fails because it was too
+        early is retried once ``BEGIN_THROTTLE`` has passed.
+
+        Set this to a number to override the learned value, or to ``None`` to
+        go back to the learned value.
+        """
+        return self._throttle.delay()
+
+    @begin_throttle.setter
+    def begin_throttle(self, throttle):
+        self._throttle.override = throttle
 
     def begin_infinite(self, record=_CONFIG_VAL, use_l3t=_CONFIG_VAL,
                        controls=_CONFIG_VAL):
@@ -344,6 +665,7 @@ class Daq:
         """
         logger.debug('Daq.stop()')
         self._control.stop()
+        self._transition_state(('Running',), 'Open')
         self._reset_begin()
         self._last_stop = time.time()
 
@@ -355,6 +677,242 @@ class Daq:
         logger.debug('Daq.end_run()')
         self.stop()
         self._control.endrun()
+        self._transition_state(('Open', 'Running'), 'Configured')
+
+    # Timing
+    @contextlib.contextmanager
+    def _timed(self, phase, start=None):
+        """
+        Record how long the body of the ``with`` block takes as ``phase``.
+        """
+        if start is None:
+            start = time.time()
+        try:
+            yield
+        finally:
+            self._record_timing(phase, start, time.time() - start)
+
+    def _record_timing(self, phase, start, duration):
+        """
+        Add one phase timing to the history and pass it to `timing_hook`.
+        """
+        self._timings.append((phase, start, duration))
+        hook = self.timing_hook
+        if hook is not None:
+            try:
+                hook(phase, duration, start)
+            except Exception:
+                logger.debug('Error in timing_hook', exc_info=True)
+
+    def timing_report(self, percentiles=(50, 90, 99)):
+        """
+        Summarize how long each phase of our recent begins and ends took.
+
+        The phases are ``configure``, ``wait_ready`` (waiting for the daq to
+        stop running), ``throttle`` (waiting out `begin_throttle`),
+        ``readback`` (reading the ``controls``), ``begin`` (the
+        ``control.begin`` call), ``begin_sleep``, ``end`` (the
+        ``control.end`` call) and ``stop_to_begin`` (the gap between a stop
+        and the next ``control.begin``). Only the last ``TIMING_HISTORY``
+        timings are kept.
+
+        To get every timing as it happens instead, set ``timing_hook`` to a
+        function with the signature ``hook(phase, duration, timestamp)``,
+        for example `log_timing`.
+
+        Parameters
+        ----------
+        percentiles: ``tuple`` of ``float``, optional
+            The percentiles to include for each phase.
+
+        Returns
+        -------
+        report: ``dict``
+            Mapping of phase to a ``dict`` with the ``count``, ``mean`` and
+            ``max`` durations in seconds, plus a ``pN`` entry for each
+            percentile ``N``.
+        """
+        by_phase = {}
+        for phase, _, duration in list(self._timings):
+            by_phase.setdefault(phase, []).append(duration)
+        report = {}
+        for phase, durations in by_phase.items():
+            durations = np.asarray(durations)
+            stats = dict(count=len(durations),
+                         mean=float(durations.mean()),
+                         max=float(durations.max()))
+            values = np.percentile(durations, percentiles)
+            for pct, value in zip(percentiles, values):
+                stats['p{:g}'.format(pct)] = float(value)
+            report[phase] = stats
+        return report
+
+    def clear_timings(self):
+        """
+        Forget the timings used in `timing_report`.
+        """
+        self._timings.clear()
+
+    # Async interface
+    async def _in_worker(self, func, *args, **kwargs):
+        """
+        Run a blocking method on the async interface thread and await it.
+
+        The async methods run one at a time, in order, on their own thread,
+        the same way the blocking methods would from a user's session. The
+        begin and end requests they make still go through the worker.
+        """
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            self._async_worker, functools.partial(func, *args, **kwargs))
+
+    async def aconnect(self):
+        """
+        Async version of `connect`.
+        """
+        await self._in_worker(self.connect)
+
+    async def adisconnect(self):
+        """
+        Async version of `disconnect`.
+        """
+        await self._in_worker(self.disconnect)
+
+    async def aconfigure(self, *args, **kwargs):
+        """
+        Async version of `configure`, with the same arguments.
+
+        Returns
+        -------
+        old, new: ``tuple`` of ``dict``
+        """
+        return await self._in_worker(self.configure, *args, **kwargs)
+
+    async def abegin(self, events=_CONFIG_VAL, duration=_CONFIG_VAL,
+                     record=_CONFIG_VAL, use_l3t=_CONFIG_VAL,
+                     controls=_CONFIG_VAL, wait=False, end_run=False):
+        """
+        Async version of `begin`, with the same arguments.
+
+        This returns once the daq has begun acquiring data, or with
+        ``wait=True`` once the daq has finished acquiring data.
+        """
+        logger.debug(('Daq.abegin(events=%s, duration=%s, record=%s, '
+                      'use_l3t=%s, controls=%s, wait=%s)'),
+                     events, duration, record, use_l3t, controls, wait)
+        old_record = _CONFIG_VAL
+        if record is not _CONFIG_VAL and record != self.record:
+            old_record = self.record
+            self.preconfig(record=record, show_queued_cfg=False)
+        try:
+            begin_status = await self._in_worker(
+                self.kickoff, events=events, duration=duration,
+                use_l3t=use_l3t, controls=controls)
+            try:
+                await asyncio.wait_for(_status_future(begin_status),
+                                       self._begin_timeout)
+            except asyncio.TimeoutError:
+                msg = (f'Timeout after {self._begin_timeout} seconds waiting '
+                       'for daq to begin.')
+                raise DaqTimeoutError(msg) from None
+            with self._timed('begin_sleep'):
+                await asyncio.sleep(self.config['begin_sleep'])
+            if wait:
+                await self.aend()
+                if end_run:
+                    await self.aend_run()
+            elif end_run:
+                asyncio.ensure_future(self._aender())
+        finally:
+            if old_record is not _CONFIG_VAL:
+                self.preconfig(record=old_record, show_queued_cfg=False)
+
+    async def _aender(self):
+        """
+        End the run when the daq stops aquiring
+        """
+        await self.aend()
+        await self.aend_run()
+
+    async def aend(self, timeout=None):
+        """
+        Async version of `wait`: finish when the daq is done acquiring.
+
+        Parameters
+        ----------
+        timeout: ``float``, optional
+            Maximum time to wait in seconds.
+        """
+        logger.debug('Daq.aend()')
+        if not self.connected:
+            await self.aconnect()
+        end_status = await self._in_worker(self._wait_status)
+        if end_status is None:
+            return
+        try:
+            await asyncio.wait_for(_status_future(end_status), timeout)
+        except asyncio.TimeoutError:
+            msg = (f'Timeout after {timeout} seconds waiting for daq '
+                   'to finish acquiring.')
+            raise DaqTimeoutError(msg) from None
+
+    def _wait_status(self):
+        """
+        Get the status that `wait` would wait for, or ``None`` if the daq is
+        not running.
+        """
+        if self.state == 'Running':
+            if self._events or self._duration:
+                return self._get_end_status()
+            else:
+                raise RuntimeError('Cannot wait, daq configured to run '
+                                   'forever.')
+        return None
+
+    async def astop(self):
+        """
+        Async version of `stop`.
+        """
+        await self._in_worker(self.stop)
+
+    async def aend_run(self):
+        """
+        Async version of `end_run`.
+        """
+        await self._in_worker(self.end_run)
+
+    async def state_stream(self):
+        """
+        Async generator of daq states.
+
+        This yields the current `state` right away, and then each new state
+        as soon as we learn about it, without polling the daq.
+        """
+        loop = asyncio.get_event_loop()
+        queue = asyncio.Queue()
+
+        def listener(state):
+            loop.call_soon_threadsafe(queue.put_nowait, state)
+
+        with self._listener_lock:
+            self._state_listeners.append(listener)
+        try:
+            last = await loop.run_in_executor(None, lambda: self.state)
+            yield last
+            while True:
+                state = await queue.get()
+                if state is None:
+                    # The cache was cleared, only a disconnect is news
+                    if self.connected:
+                        continue
+                    state = 'Disconnected'
+                if state != last:
+                    last = state
+                    yield state
+        finally:
+            with self._listener_lock:
+                if listener in self._state_listeners:
+                    self._state_listeners.remove(listener)
 
     # Reader interface
     @check_connect
@@ -430,48 +988,42 @@ class Daq:
                 logger.debug(err, exc_info=True)
                 raise StateTransitionError(err)
 
-        check_run_number = all((self.state == 'Configured',
-                                self.config['record'],
-                                not self._check_run_number_has_failed))
-        if check_run_number:
-            try:
-                prev_run = self.run_number()
-                next_run = prev_run + 1
-            except Exception:
-                logger.debug('Error getting run number in kickoff',
-                             exc_info=True)
-                next_run = None
-                # Only try this once if it fails to prevent repeated timeouts
-                self._check_run_number_has_failed = True
-        else:
-            next_run = None
+        # Only a recorded begin from Configured starts a new run
+        new_run = self.state == 'Configured' and bool(self.config['record'])
+        if new_run and self._last_run is None:
+            # Seed the run number in the background for the log messages
+            self._reconcile_run_number()
 
-        def start_thread(control, status, events, duration, use_l3t, controls,
-                         run_number):
-            tmo = self._begin_timeout
-            dt = 0.1
+        def start_task(control, status, events, duration, use_l3t, controls,
+                       new_run, prepared):
             logger.debug('Make sure daq is ready to begin')
             # Stop and start if we already started
-            if self.state in ('Open', 'Running'):
+            if self.state == 'Running':
                 self.stop()
             # It can take up to 0.4s after a previous begin to be ready
-            while tmo > 0:
-                if self.state in ('Configured', 'Open'):
-                    break
-                else:
-                    tmo -= dt
-            if self.state in ('Configured', 'Open'):
-                begin_args = self._begin_args(events, duration, use_l3t,
-                                              controls)
-                if run_number is not None:
-                    logger.info('Beginning daq run %s', run_number)
+            with self._timed('wait_ready'):
+                state = self._wait_for_ready(self._begin_timeout)
+            if state in ('Configured', 'Open'):
+                with self._timed('readback'):
+                    if prepared is None:
+                        begin_args = self._begin_args(events, duration,
+                                                      use_l3t, controls)
+                    else:
+                        begin_args = prepared.result()
+                if new_run and self._last_run is not None:
+                    logger.info('Beginning daq run %s', self._last_run + 1)
 
                 logger.debug('daq.control.begin(%s)', begin_args)
-                dt = time.time() - self._last_stop
-                tmo = BEGIN_THROTTLE - dt
-                if tmo > 0:
-                    time.sleep(tmo)
-                control.begin(**begin_args)
+                try:
+                    self._throttled_begin(control, begin_args)
+                except Exception as exc:
+                    logger.debug('Marking kickoff as failed', exc_info=True)
+                    self._clear_state()
+                    status.set_exception(exc)
+                    return
+                self._set_state('Running')
+                if new_run:
+                    self._advance_run_number()
                 # Cache these so we know what the most recent begin was told
                 self._begin = dict(events=events, duration=duration,
                                    use_l3t=use_l3t, controls=controls)
@@ -481,14 +1033,85 @@ class Daq:
                 logger.debug('Marking kickoff as failed')
                 status.set_exception(RuntimeError('Daq begin failed!'))
 
+        if self.pipeline:
+            # Read the controls while we stop and get the daq ready
+            prepared = self._prefetch.submit(self._begin_args, events,
+                                             duration, use_l3t, controls)
+        else:
+            prepared = None
+
+        # Don't let a queued begin wait behind the end of a run we are
+        # replacing. The begin task will also check this in order.
+        if self.state == 'Running':
+            self.stop()
+
         begin_status = Status(obj=self)
-        watcher = threading.Thread(target=start_thread,
-                                   args=(self._control, begin_status, events,
-                                         duration, use_l3t, controls,
-                                         next_run))
-        watcher.start()
+        self._submit(start_task, self._control, begin_status, events,
+                     duration, use_l3t, controls, new_run, prepared)
         return begin_status
 
+    def _throttled_begin(self, control, begin_args):
+        """
+        Call ``control.begin``, waiting out the `begin_throttle` first.
+
+        Begins that happen sooner than ``BEGIN_THROTTLE`` after a stop are
+        used to update the learned throttle. If one of these fails, we try
+        once more after ``BEGIN_THROTTLE`` has passed.
+        """
+        throttle = self.begin_throttle
+        tmo = throttle - (time.time() - self._last_stop)
+        if tmo > 0:
+            with self._timed('throttle'):
+                time.sleep(tmo)
+        interval = time.time() - self._last_stop
+        early = tmo > 0 or interval < BEGIN_THROTTLE
+        try:
+            self._timed_begin(control, begin_args)
+        except Exception:
+            if not early:
+                raise
+            logger.debug('Early begin failed %.3fs after a stop', interval,
+                         exc_info=True)
+            tmo = BEGIN_THROTTLE - (time.time() - self._last_stop)
+            if tmo <= 0:
+                raise
+            with self._timed('throttle'):
+                time.sleep(tmo)
+            self._timed_begin(control, begin_args)
+            # Only learn from this if waiting longer fixed it
+            self._throttle.record(interval, False, self._host)
+        else:
+            if early:
+                self._throttle.record(interval, True, self._host)
+
+    def _timed_begin(self, control, begin_args):
+        """
+        Call ``control.begin``, timing it and the gap since the last stop.
+        """
+        start = time.time()
+        if self._last_stop:
+            self._record_timing('stop_to_begin', self._last_stop,
+                                start - self._last_stop)
+        with self._timed('begin', start=start):
+            control.begin(**begin_args)
+
+    def _submit(self, task, control, status, *args):
+        """
+        Queue up a begin or end task to run on the daq command worker.
+
+        Tasks are run one at a time in the order they were submitted. The
+        ``status`` will be marked as failed if the task raises an exception.
+        """
+        def run_task():
+            try:
+                task(control, status, *args)
+            except Exception as exc:
+                logger.debug('Error in daq task %s', task.__name__,
+                             exc_info=True)
+                if not status.done:
+                    status.set_exception(exc)
+        self._worker.submit(run_task)
+
     def complete(self):
         """
         If the daq is freely running, this will `stop` the daq.
@@ -527,20 +1150,20 @@ class Daq:
             logger.debug('Getting end status for events=%s, duration=%s',
                          events, duration)
 
-            def finish_thread(control, status):
+            def finish_task(control, status):
                 try:
                     logger.debug('Daq.control.end()')
-                    control.end()
+                    with self._timed('end'):
+                        control.end()
                 except RuntimeError:
                     pass  # This means we aren't running, so no need to wait
+                self._transition_state(('Running',), 'Open')
                 self._last_stop = time.time()
                 self._reset_begin()
                 status.set_finished()
                 logger.debug('Marked acquisition as complete')
             end_status = Status(obj=self)
-            watcher = threading.Thread(target=finish_thread,
-                                       args=(self._control, end_status))
-            watcher.start()
+            self._submit(finish_task, self._control, end_status)
             return end_status
         else:
             # Configured to run forever, say we're done so we can wait for just
@@ -694,11 +1317,15 @@ class Daq:
                      'use_l3t=%s, controls=%s, begin_sleep=%s',
                      events, duration, record, use_l3t, controls, begin_sleep)
 
+        start = time.time()
+        self._subscribe_controls(controls)
         config_args = self._config_args(record, use_l3t, controls)
         try:
             logger.debug('Daq.control.configure(%s)',
                          config_args)
             self._control.configure(**config_args)
+            self._record_timing('configure', start, time.time() - start)
+            self._set_state('Configured')
             # self._config should reflect exactly the arguments to configure,
             # this is different than the arguments that pydaq.Control expects
             self._config = dict(events=events, duration=duration,
@@ -708,6 +1335,9 @@ class Daq:
             self.config_info(header='Daq configured:')
         except Exception as exc:
             self._config = None
+            # Don't keep updating values for a configuration we don't have
+            self._subscribe_controls(None)
+            self._clear_state()
             msg = 'Failed to configure!'
             logger.debug(msg, exc_info=True)
             raise RuntimeError(msg) from exc
@@ -792,31 +1422,134 @@ class Daq:
     def _ctrl_arg(self, controls):
         """
         Assemble the list of ``(str, val)`` pairs from a ``{str: device}``
-        dictionary or a device ``list``
+        dictionary or a sequence of devices
+
+        Configured controls devices are taken from the values cached by their
+        subscriptions. Other devices, and devices that have not updated in
+        ``CONTROLS_STALE_TIME`` seconds, are read in parallel, and all of
+        them together have up to ``CONTROLS_TIMEOUT`` seconds to respond.
+        Each read gets its own daemon thread, so a device that never answers
+        cannot hold up the reads for later begins.
 
         Returns
         -------
         ctrl_arg: ``list[(str, val), ...]``
+
+        Raises
+        ------
+        DaqTimeoutError:
+            If a device took too long to read.
         """
-        ctrl_arg = []
-        if isinstance(controls, list):
-            names = [dev.name for dev in controls]
-            devices = controls
-        elif isinstance(controls, dict):
+        if isinstance(controls, dict):
             names = controls.keys()
             devices = controls.values()
+        else:
+            devices = list(controls)
+            names = [dev.name for dev in devices]
+        reads = []
         for name, device in zip(names, devices):
             try:
-                val = device.position
-            except AttributeError:
-                val = device.get()
-            try:
-                val = val[0]
-            except Exception:
-                pass
+                val = self._cached_control(device)
+            except KeyError:
+                val = _daemon_future(_read_control, device,
+                                     name='daq_readback')
+            reads.append((name, device, val))
+        futures = [val for _, _, val in reads if isinstance(val, Future)]
+        _, not_done = wait_futures(futures, timeout=CONTROLS_TIMEOUT)
+        ctrl_arg = []
+        for name, device, val in reads:
+            if isinstance(val, Future):
+                if val in not_done:
+                    msg = (f'Timeout after {CONTROLS_TIMEOUT} seconds reading '
+                           f'control {name} from {device!r}.')
+                    raise DaqTimeoutError(msg)
+                val = val.result()
             ctrl_arg.append((name, val))
         return ctrl_arg
 
+    def _subscribe_controls(self, controls):
+        """
+        Keep the cached values up to date for exactly these controls devices.
+
+        Devices that cannot be subscribed to will be read directly each time.
+        """
+        if isinstance(controls, dict):
+            devices = list(controls.values())
+        else:
+            devices = list(controls or [])
+        keep = {id(dev) for dev in devices}
+        for key in list(self._ctrl_subs):
+            if key not in keep:
+                device, cid = self._ctrl_subs.pop(key)
+                self._ctrl_cache.pop(key, None)
+                try:
+                    device.unsubscribe(cid)
+                except Exception:
+                    logger.debug('Error unsubscribing from %s', device,
+                                 exc_info=True)
+        for device in devices:
+            key = id(device)
+            if key in self._ctrl_subs:
+                continue
+
+            def update(*args, value=None, timestamp=None, _key=key,
+                       **kwargs):
+                try:
+                    value = value[0]
+                except Exception:
+                    pass
+                self._ctrl_cache[_key] = (value, time.time())
+            try:
+                cid = device.subscribe(update, run=True)
+            except Exception:
+                logger.debug('Cannot subscribe to %s, will read directly',
+                             device, exc_info=True)
+                continue
+            self._ctrl_subs[key] = (device, cid)
+
+    def stale_controls(self):
+        """
+        The names of the configured controls devices that have not updated
+        in the last ``CONTROLS_STALE_TIME`` seconds, or that never updated.
+
+        These are read directly at each begin instead of using the value from
+        their subscriptions.
+
+        Returns
+        -------
+        stale: ``list`` of ``str``
+        """
+        controls = self.config['controls']
+        if isinstance(controls, list):
+            items = [(dev.name, dev) for dev in controls]
+        elif isinstance(controls, dict):
+            items = list(controls.items())
+        else:
+            items = []
+        stale = []
+        for name, device in items:
+            try:
+                self._cached_control(device)
+            except KeyError:
+                stale.append(name)
+        return stale
+
+    def _cached_control(self, device):
+        """
+        Get the value from a controls device's subscription.
+
+        Raises
+        ------
+        KeyError:
+            If we have no value for this device, or if the value is stale.
+        """
+        val, timestamp = self._ctrl_cache[id(device)]
+        age = time.time() - timestamp
+        if CONTROLS_STALE_TIME is not None and age > CONTROLS_STALE_TIME:
+            logger.debug('Control value from %s is stale', device)
+            raise KeyError(id(device))
+        return val
+
     def _begin_args(self, events, duration, use_l3t, controls):
         """
         For a given set of arguments to `begin`, return the arguments that
@@ -1044,6 +1777,21 @@ class Daq:
         subprocess.TimeoutExpired:
             if the get run number script fails
         """
+        run_number, _, _ = self._query_run_number(hutch_name)
+        if hutch_name is None:
+            self._update_run_number(run_number)
+        return run_number
+
+    def _query_run_number(self, hutch_name=None):
+        """
+        Call the run number script, as described in `run_number`.
+
+        Returns
+        -------
+        run_number, live, begun: ``tuple``
+            The run number, whether it came from a live lookup, and the count
+            in ``_runs_begun`` from when we picked the lookup.
+        """
         try:
             if hutch_name is None:
                 hutch_name = ext_scripts.hutch_name()
@@ -1051,21 +1799,89 @@ class Daq:
                                   'mec', 'tst'):
                 raise ValueError(('{} is not a valid hutch, cannot determine '
                                   'run number'.format(hutch_name)))
-            if self.state in ('Open', 'Running') and self.config['record']:
-                return ext_scripts.get_run_number(hutch=hutch_name, live=True)
-            else:
-                return ext_scripts.get_run_number(hutch=hutch_name, live=False)
+            # A begin can't be counted between these two lines
+            with self._run_number_lock:
+                begun = self._runs_begun
+                live = (self.state in ('Open', 'Running')
+                        and bool(self.config['record']))
+            run_number = ext_scripts.get_run_number(hutch=hutch_name,
+                                                    live=live)
         except FileNotFoundError:
             raise RuntimeError('No nfs access, cannot determine run number.')
+        return run_number, live, begun
+
+    def _update_run_number(self, run_number, live=True, begun=None):
+        """
+        Reconcile our run number with one from the run number script.
+
+        The script can lag behind a begin, so we never go backwards. If this
+        is the first run number we get and it came from a lookup that was not
+        live, the recorded runs that began after ``begun`` from
+        `_query_run_number` are added on top. A live lookup already includes
+        them.
+        """
+        with self._run_number_lock:
+            if self._last_run is None:
+                if not live and begun is not None:
+                    run_number += self._runs_begun - begun
+                self._last_run = run_number
+            elif run_number >= self._last_run:
+                self._last_run = run_number
+            else:
+                logger.debug('Ignoring run number %s, we expect %s',
+                             run_number, self._last_run)
+
+    def _advance_run_number(self):
+        """
+        Count a new recorded run locally, then check the script in the
+        background.
+        """
+        with self._run_number_lock:
+            self._runs_begun += 1
+            if self._last_run is not None:
+                self._last_run += 1
+        self._reconcile_run_number()
+
+    def _reconcile_run_number(self):
+        """
+        Check the run number script in the background.
+
+        If the script fails, we stop checking for the rest of the session. The
+        run number is merely cosmetic and should not slow down the scan.
+        """
+        with self._run_number_lock:
+            if self._check_run_number_has_failed or self._run_number_pending:
+                return
+            self._run_number_pending = True
+        self._run_number_worker.submit(self._fetch_run_number)
+
+    def _fetch_run_number(self):
+        try:
+            run_number, live, begun = self._query_run_number()
+            self._update_run_number(run_number, live=live, begun=begun)
+        except Exception:
+            logger.debug('Error getting run number in the background',
+                         exc_info=True)
+            self._check_run_number_has_failed = True
+        finally:
+            with self._run_number_lock:
+                self._run_number_pending = False
 
     def __del__(self):
         try:
             self.disconnect()
         except Exception:
             pass
+        try:
+            self._worker.shutdown(wait=False)
+            self._async_worker.shutdown(wait=False)
+            self._prefetch.shutdown(wait=False)
+            self._run_number_worker.shutdown(wait=False)
+        except Exception:
+            pass
 
     def set_filter(self, *args, event_codes=None, operator='&',
-                   or_bykik=False):
+                   or_bykik=False, force=False):
         """
         Set up the l3t filters.
 
@@ -1104,42 +1920,572 @@ class Daq:
             False by default, appends an ``or`` condition that marks l3t pass
             when we see the bykik event code. This makes sure the off shots
             make it into the data if we're in l3t veto mode.
+
+        force: ``bool``, optional
+            False by default. Normally we skip the push if the same filter, or
+            the same clear, was the last thing we sent to pyami. Set this to
+            ``True`` to push anyway.
         """
 
         return set_pyami_filter(*args, event_codes=event_codes,
-                                operator=operator, or_bykik=or_bykik)
+                                operator=operator, or_bykik=or_bykik,
+                                force=force)
 
     def set_monitor(self, det):
         return set_monitor_det(det)
     set_monitor.__doc__ = set_monitor_det.__doc__
 
 
+class DaqGroup:
+    """
+    Several `Daq` objects run together as one ``bluesky`` object.
+
+    Each call is made on every daq at once, and waits for all of them. The
+    ``Status`` objects from `kickoff`, `complete` and `trigger` are combined
+    into one that finishes when every daq's ``Status`` has finished.
+
+    This can be used as a ``Reader`` or as a ``Flyer`` in the same way as a
+    single `Daq`.
+
+    Parameters
+    ----------
+    daqs: ``list`` of `Daq`
+        The daqs to run together. Each must have a different ``name``.
+
+    name: ``str``, optional
+        The ``bluesky`` name of the group.
+    """
+    parent = None
+
+    def __init__(self, daqs, name='daq_group'):
+        self.daqs = list(daqs)
+        if not self.daqs:
+            raise ValueError('DaqGroup needs at least one Daq')
+        names = [daq.name for daq in self.daqs]
+        if len(set(names)) != len(names):
+            raise ValueError('Daq names must be unique in a DaqGroup, got {}'
+                             .format(names))
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=len(self.daqs),
+                                            thread_name_prefix='daq_group')
+
+    def _call_all(self, method, *args, **kwargs):
+        """
+        Call ``method`` on every daq at once and return the results in order.
+
+        If any call raises, the first exception is raised again once every
+        call has finished.
+        """
+        futures = [self._executor.submit(getattr(daq, method), *args,
+                                         **kwargs)
+                   for daq in self.daqs]
+        results = []
+        error = None
+        for daq, future in zip(self.daqs, futures):
+            try:
+                results.append(future.result())
+            except Exception as exc:
+                logger.debug('%s.%s() failed', daq.name, method,
+                             exc_info=True)
+                if error is None:
+                    error = exc
+        if error is not None:
+            raise error
+        return results
+
+    def _combine(self, statuses):
+        return functools.reduce(AndStatus, statuses)
+
+    @property
+    def state(self):
+        """
+        Mapping of daq name to that daq's state.
+        """
+        return {daq.name: daq.state for daq in self.daqs}
+
+    def connect(self):
+        """
+        Connect every daq.
+        """
+        logger.debug('DaqGroup.connect()')
+        self._call_all('connect')
+
+    def disconnect(self):
+        """
+        Disconnect every daq.
+        """
+        logger.debug('DaqGroup.disconnect()')
+        self._call_all('disconnect')
+
+    def configure(self, **kwargs):
+        """
+        Configure every daq with the same arguments.
+
+        See `Daq.configure` for the arguments.
+
+        Returns
+        -------
+        old, new: ``tuple`` of ``dict``
+            The combined `read_configuration` before and after.
+        """
+        logger.debug('DaqGroup.configure(%s)', kwargs)
+        results = self._call_all('configure', **kwargs)
+        old = {}
+        new = {}
+        for daq, (daq_old, daq_new) in zip(self.daqs, results):
+            old.update(self._prefix(daq, daq_old))
+            new.update(self._prefix(daq, daq_new))
+        return old, new
+
+    def begin(self, wait=False, end_run=False, **kwargs):
+        """
+        Start every daq and block until they have all begun.
+
+        See `Daq.begin` for the arguments.
+        """
+        logger.debug('DaqGroup.begin(wait=%s, end_run=%s, %s)',
+                     wait, end_run, kwargs)
+        try:
+            self._call_all('begin', **kwargs)
+            if wait:
+                self.wait()
+                if end_run:
+                    self.end_run()
+            if end_run and not wait:
+                threading.Thread(target=self._ender_thread, args=()).start()
+        except KeyboardInterrupt:
+            self.end_run()
+            logger.info('%s.begin interrupted, ending runs', self.name)
+
+    def _ender_thread(self):
+        self.wait()
+        self.end_run()
+
+    def wait(self, timeout=None):
+        """
+        Pause the thread until every daq is done acquiring.
+        """
+        logger.debug('DaqGroup.wait()')
+        self._call_all('wait', timeout=timeout)
+
+    def stop(self):
+        """
+        Stop every daq.
+        """
+        logger.debug('DaqGroup.stop()')
+        self._call_all('stop')
+
+    def end_run(self):
+        """
+        End the run on every daq.
+        """
+        logger.debug('DaqGroup.end_run()')
+        self._call_all('end_run')
+
+    # Reader interface
+    def trigger(self):
+        """
+        Begin acquisition on every daq, blocking until they have all begun.
+
+        Returns
+        -------
+        done_status: ``Status``
+            ``Status`` that will be marked as done when every daq has stopped
+            acquiring.
+        """
+        return self._combine(self._call_all('trigger'))
+
+    def read(self):
+        """
+        Stop any daq that is still running. There is no data.
+        """
+        self._call_all('read')
+        return {}
+
+    def describe(self):
+        """
+        Explain what read returns. There is nothing.
+        """
+        return {}
+
+    # Flyer interface
+    def kickoff(self, **kwargs):
+        """
+        Begin acquisition on every daq. This method is non-blocking.
+
+        See `Daq.kickoff` for the arguments.
+
+        Returns
+        -------
+        ready_status: ``Status``
+            ``Status`` that will be marked as done when every daq has begun.
+        """
+        logger.debug('DaqGroup.kickoff(%s)', kwargs)
+        return self._combine(self._call_all('kickoff', **kwargs))
+
+    def complete(self):
+        """
+        Stop every freely running daq, and collect the end status of each.
+
+        Returns
+        -------
+        end_status: ``Status``
+            ``Status`` that will be marked as done when every daq has finished
+            acquiring.
+        """
+        logger.debug('DaqGroup.complete()')
+        return self._combine(self._call_all('complete'))
+
+    def collect(self):
+        """
+        Collect from every daq. There are no events to report.
+        """
+        for daq in self.daqs:
+            yield from daq.collect()
+
+    def describe_collect(self):
+        """
+        Explain what collect returns. There is nothing.
+        """
+        return {}
+
+    def read_configuration(self):
+        """
+        Every daq's `Daq.read_configuration`, with keys prefixed by the daq
+        name.
+        """
+        config = {}
+        for daq in self.daqs:
+            config.update(self._prefix(daq, daq.read_configuration()))
+        return config
+
+    def describe_configuration(self):
+        """
+        Every daq's `Daq.describe_configuration`, with keys prefixed by the
+        daq name.
+        """
+        config = {}
+        for daq in self.daqs:
+            config.update(self._prefix(daq, daq.describe_configuration()))
+        return config
+
+    def _prefix(self, daq, config):
+        return {'{}_{}'.format(daq.name, key): value
+                for key, value in config.items()}
+
+    def stage(self):
+        """
+        Stage every daq.
+
+        Returns
+        -------
+        staged: ``list``
+            list of devices staged
+        """
+        logger.debug('DaqGroup.stage()')
+        self._call_all('stage')
+        return [self]
+
+    def unstage(self):
+        """
+        Unstage every daq.
+
+        Returns
+        -------
+        unstaged: ``list``
+            list of devices unstaged
+        """
+        logger.debug('DaqGroup.unstage()')
+        self._call_all('unstage')
+        return [self]
+
+    def pause(self):
+        """
+        Stop every running daq without ending the runs.
+        """
+        logger.debug('DaqGroup.pause()')
+        self._call_all('pause')
+
+    def resume(self):
+        """
+        Start every paused daq again.
+        """
+        logger.debug('DaqGroup.resume()')
+        self._call_all('resume')
+
+    def __del__(self):
+        try:
+            self._executor.shutdown(wait=False)
+        except Exception:
+            pass
+
+
 class StateTransitionError(Exception):
     pass
 
 
+class _BeginThrottle:
+    """
+    Learns the shortest safe wait between a stop and the next begin.
+
+    We start at ``BEGIN_THROTTLE``. Every ``THROTTLE_STREAK`` early begins
+    that succeed in a row, we lower the throttle by ``THROTTLE_DECREASE``.
+    When an early begin fails, we raise the throttle to ``THROTTLE_MARGIN``
+    times the failed interval and never go that low again.
+    """
+    def __init__(self):
+        self.override = None
+        self.learned = None
+        self.floor = 0
+        self.streak = 0
+        self.history = deque(maxlen=100)
+
+    def load(self, hints):
+        """
+        Pick up a throttle learned in a previous session.
+        """
+        if self.learned is None:
+            self.learned = hints.get('begin_throttle')
+            self.floor = hints.get('begin_throttle_floor', 0)
+
+    def delay(self):
+        """
+        The number of seconds to wait after a stop before a begin.
+        """
+        if self.override is not None:
+            return self.override
+        elif self.learned is None:
+            return BEGIN_THROTTLE
+        else:
+            return min(self.learned, BEGIN_THROTTLE)
+
+    def record(self, interval, success, host):
+        """
+        Learn from a begin that happened ``interval`` seconds after a stop.
+        """
+        self.history.append((time.time(), interval, success))
+        if self.learned is None:
+            current = BEGIN_THROTTLE
+        else:
+            current = self.learned
+        if success:
+            self.streak += 1
+            if self.streak < THROTTLE_STREAK:
+                return
+            self.streak = 0
+            learned = max(current * THROTTLE_DECREASE,
+                          self.floor * THROTTLE_MARGIN)
+        else:
+            self.streak = 0
+            self.floor = max(self.floor, interval)
+            learned = max(current, self.floor * THROTTLE_MARGIN)
+        learned = min(learned, BEGIN_THROTTLE)
+        if learned != self.learned:
+            logger.debug('Learned begin throttle is now %.3fs', learned)
+            self.learned = learned
+            save_hints(host, begin_throttle=learned,
+                       begin_throttle_floor=self.floor)
+
+
+def _daemon_future(func, *args, name=None):
+    """
+    Call ``func(*args)`` in a new daemon thread and return its ``Future``.
+
+    Unlike a ``ThreadPoolExecutor``, a call that never returns only holds on
+    to its own thread, and does not hold up the interpreter at exit.
+    """
+    future = Future()
+
+    def inner():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args))
+        except Exception as exc:
+            future.set_exception(exc)
+
+    threading.Thread(target=inner, daemon=True, name=name).start()
+    return future
+
+
+def _read_control(device):
+    """
+    Get the value to report to the daq for one controls device.
+    """
+    try:
+        val = device.position
+    except AttributeError:
+        val = device.get()
+    try:
+        val = val[0]
+    except Exception:
+        pass
+    return val
+
+
+def log_timing(phase, duration, timestamp):
+    """
+    `Daq.timing_hook` that sends each phase timing to the log.
+
+    Parameters
+    ----------
+    phase: ``str``
+        The phase name, as described in `Daq.timing_report`.
+
+    duration: ``float``
+        How long the phase took, in seconds.
+
+    timestamp: ``float``
+        When the phase started.
+    """
+    logger.info('Daq %s took %.3fs', phase, duration,
+                extra=dict(phase=phase, duration=duration,
+                           phase_start=timestamp))
+
+
+def _status_future(status):
+    """
+    Wrap an ophyd ``Status`` in an ``asyncio`` future for the running loop.
+    """
+    loop = asyncio.get_event_loop()
+    future = loop.create_future()
+
+    def set_future(status):
+        if future.done():
+            return
+        if status.success:
+            future.set_result(None)
+        else:
+            exc = status.exception()
+            if exc is None:
+                exc = RuntimeError(f'{status} failed')
+            future.set_exception(exc)
+
+    status.add_callback(lambda status: loop.call_soon_threadsafe(set_future,
+                                                                 status))
+    return future
+
+
+def _disconnect_loser(future):
+    """
+    Done callback that disconnects a platform that lost the connect race.
+    """
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        future.result().disconnect()
+    except Exception:
+        logger.debug('Error disconnecting unused platform', exc_info=True)
+
+
+def load_hints(host):
+    """
+    Load the saved notes about the daq on a particular host.
+
+    Parameters
+    ----------
+    host: ``str``
+        The hostname the notes were saved for.
+
+    Returns
+    -------
+    hints: ``dict``
+        The saved notes, or an empty ``dict`` if there are none.
+    """
+    if HINTS_FILE is None:
+        return {}
+    try:
+        with open(HINTS_FILE, 'r') as f:
+            hints = json.load(f)
+        return dict(hints.get(host, {}))
+    except FileNotFoundError:
+        return {}
+    except Exception:
+        logger.debug('Could not read hints from %s', HINTS_FILE,
+                     exc_info=True)
+        return {}
+
+
+def save_hints(host, **hints):
+    """
+    Update the saved notes about the daq on a particular host.
+
+    Failures are logged and otherwise ignored, the notes are only an aid to
+    speed things up next time.
+
+    Parameters
+    ----------
+    host: ``str``
+        The hostname to save the notes for.
+
+    **hints:
+        The values to update.
+    """
+    if HINTS_FILE is None:
+        return
+    try:
+        try:
+            with open(HINTS_FILE, 'r') as f:
+                all_hints = json.load(f)
+        except FileNotFoundError:
+            all_hints = {}
+        all_hints.setdefault(host, {}).update(hints)
+        tmp_file = '{}.{}.tmp'.format(HINTS_FILE, os.getpid())
+        with open(tmp_file, 'w') as f:
+            json.dump(all_hints, f, indent=2, sort_keys=True)
+        os.replace(tmp_file, HINTS_FILE)
+    except Exception:
+        logger.debug('Could not save hints to %s', HINTS_FILE, exc_info=True)
+
+
 _daq_instance = None
+# Every registered daq by name, in the order they were first registered
+_daq_instances = {}
 
 
 def register_daq(daq):
     """
-    Called by `Daq` at the end of ``__init__`` to save our one daq instance as
-    the real `Daq`. There will always only be one `Daq`.
+    Called by `Daq` at the end of ``__init__`` to save the daq instance.
+
+    A `Daq` with the same ``name`` as an earlier one replaces it. The first
+    `Daq` registered, or any `Daq` that replaces it, is the default returned
+    by `get_daq`.
 
     Parameters
     ----------
     daq: `Daq`
     """
     global _daq_instance
-    _daq_instance = daq
+    if _daq_instance is None or _daq_instance.name == daq.name:
+        _daq_instance = daq
+    _daq_instances[daq.name] = daq
 
 
-def get_daq():
+def get_daq(name=None):
     """
-    Called by other modules to get the registered `Daq` instance.
+    Called by other modules to get a registered `Daq` instance.
+
+    Parameters
+    ----------
+    name: ``str``, optional
+        The name of the `Daq` to get. By default, return the default `Daq`.
 
     Returns
     -------
     daq: `Daq`
+        The `Daq`, or ``None`` if there is no such `Daq`.
+    """
+    if name is None:
+        return _daq_instance
+    return _daq_instances.get(name)
+
+
+def get_daqs():
+    """
+    Get every registered `Daq` instance.
+
+    Returns
+    -------
+    daqs: ``list`` of `Daq`
     """
-    return _daq_instance
+    return list(_daq_instances.values())
@@ -2,6 +2,9 @@ import logging
 import re
 import socket
 import subprocess
+import threading
+import time
+from collections import OrderedDict
 
 
 logger = logging.getLogger(__name__)
@@ -27,28 +30,191 @@ def call_script(args, timeout=None, ignore_return_code=False):
         raise
 
 
-cache = {}
+# Cache lifetimes in seconds for script output, None to never expire
+HUTCH_NAME_TTL = 600
+AMI_PROXY_TTL = 600
+RUN_NUMBER_TTL = 1
+# Keep at most this many script results
+CACHE_SIZE = 128
 
 
-def cache_script(args, timeout=None, ignore_return_code=False):
-    key = ' '.join(args)
-    try:
-        return cache[key]
-    except KeyError:
+class ScriptCache:
+    """
+    Bounded cache of external script output.
+
+    Each entry is fresh for ``ttl`` seconds after it was fetched. After that,
+    it may still be returned for ``stale_ttl`` more seconds while a fresh
+    value is fetched in the background. The least recently used entries are
+    dropped once we have more than ``maxsize`` entries.
+
+    Parameters
+    ----------
+    maxsize: ``int``, optional
+        The maximum number of entries to keep.
+    """
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+    def get(self, args, timeout=None, ignore_return_code=False, ttl=None,
+            stale_ttl=0):
+        """
+        Get the script output from the cache, calling the script if needed.
+
+        Parameters
+        ----------
+        args: ``list`` or ``str``
+            The script and its arguments, as in `call_script`.
+
+        timeout: ``float``, optional
+            Timeout for the script call.
+
+        ignore_return_code: ``bool``, optional
+            Passed through to `call_script`.
+
+        ttl: ``float``, optional
+            Seconds before the output needs to be refreshed. If omitted, the
+            output never expires.
+
+        stale_ttl: ``float``, optional
+            Seconds after ``ttl`` where we return the old output while
+            refreshing it in the background. ``None`` means forever.
+        """
+        key = _cache_key(args)
+        now = time.monotonic()
+        with self._lock:
+            try:
+                output, fetched = self._entries[key]
+            except KeyError:
+                age = None
+            else:
+                age = now - fetched
+                self._entries.move_to_end(key)
+            if age is not None:
+                if ttl is None or age < ttl:
+                    self.hits += 1
+                    return output
+                if stale_ttl is None or age < ttl + stale_ttl:
+                    self.stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(target=self._refresh,
+                                         args=(key, args, timeout,
+                                               ignore_return_code),
+                                         daemon=True).start()
+                    return output
+            self.misses += 1
         output = call_script(args, timeout=timeout,
                              ignore_return_code=ignore_return_code)
-        cache[key] = output
+        self._store(key, output)
         return output
 
+    def _refresh(self, key, args, timeout, ignore_return_code):
+        try:
+            output = call_script(args, timeout=timeout,
+                                 ignore_return_code=ignore_return_code)
+        except Exception:
+            logger.debug('Background refresh of %s failed', key,
+                         exc_info=True)
+        else:
+            self._store(key, output)
+            with self._lock:
+                self.refreshes += 1
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, output):
+        with self._lock:
+            self._entries[key] = (output, time.monotonic())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        """
+        Forget all cached output.
+        """
+        with self._lock:
+            self._entries.clear()
+
+    def reset_stats(self):
+        """
+        Set all the counters in `stats` back to zero.
+        """
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Report how the cache has been used.
+
+        Returns
+        -------
+        stats: ``dict``
+            ``hits`` and ``stale_hits`` are the script calls we avoided,
+            ``misses`` and ``refreshes`` are the script calls we made in the
+            foreground and the background, ``evictions`` is the number of
+            entries dropped to stay under ``maxsize``, and ``size`` is the
+            current number of entries.
+        """
+        with self._lock:
+            return dict(hits=self.hits, stale_hits=self.stale_hits,
+                        misses=self.misses, refreshes=self.refreshes,
+                        evictions=self.evictions, size=len(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _cache_key(args):
+    if isinstance(args, str):
+        return args
+    return ' '.join(args)
+
+
+cache = ScriptCache()
+
+
+def cache_script(args, timeout=None, ignore_return_code=False, ttl=None,
+                 stale_ttl=0):
+    """
+    Call a script through the module-level `ScriptCache`.
+
+    See `ScriptCache.get` for the arguments.
+    """
+    return cache.get(args, timeout=timeout,
+                     ignore_return_code=ignore_return_code, ttl=ttl,
+                     stale_ttl=stale_ttl)
+
 
 def clear_script_cache():
-    global cache
-    cache = {}
+    """
+    Forget all cached script output.
+    """
+    cache.clear()
+
+
+def script_cache_stats():
+    """
+    Report the hits, misses, and other counters from the script cache.
+
+    See `ScriptCache.stats`.
+    """
+    return cache.stats()
 
 
 def hutch_name(timeout=10):
     script = SCRIPTS.format('latest', 'get_hutch_name')
-    name = cache_script(script, timeout=timeout)
+    name = cache_script(script, timeout=timeout, ttl=HUTCH_NAME_TTL,
+                        stale_ttl=None)
     return name.lower().strip(' \n')
 
 
@@ -60,7 +226,7 @@ def get_run_number(hutch=None, live=False, timeout=1):
         args += ['-i', hutch]
     if live:
         args += ['-l']
-    run_number = call_script(args, timeout=timeout)
+    run_number = cache_script(args, timeout=timeout, ttl=RUN_NUMBER_TTL)
     return int(run_number)
 
 
@@ -83,7 +249,9 @@ def get_ami_proxy(hutch, timeout=10):
     procmgr = TOOLS.format('procmgr', 'procmgr')
     output = cache_script([procmgr, 'status', cnf, 'ami_proxy'],
                           timeout=timeout,
-                          ignore_return_code=True)
+                          ignore_return_code=True,
+                          ttl=AMI_PROXY_TTL,
+                          stale_ttl=None)
     for line in output.split('\n'):
         proxy_match = proxy_re.search(line)
         if proxy_match:
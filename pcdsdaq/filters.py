@@ -0,0 +1,393 @@
+"""
+Expression trees for the l3t/pyami filter syntax.
+
+Filters are built from `Range` and `EventCode` terms combined with `And` and
+`Or`, or with the ``&`` and ``|`` operators. `Filter.canonical` flattens
+nested operators of the same kind, removes duplicate terms and sorts what is
+left, so two filters that mean the same thing render to the same string and
+compare and hash equal.
+
+Filters can also be evaluated against arrays of per-shot values with
+`Filter.evaluate`, which lets us preview an l3t pass rate with `pass_rate`
+and `expected_duration` before pushing the filter to the DAQ.
+"""
+import logging
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+EVR_NAME = 'DAQ:EVR:Evt{}'
+# Beam rate used to estimate how long it takes to collect a number of events
+SHOT_RATE = 120
+
+
+class Filter:
+    """
+    Base class for filter expressions.
+    """
+    def key(self):
+        """
+        Hashable description of the canonical filter, for sorting and caching.
+        """
+        raise NotImplementedError
+
+    def canonical(self):
+        """
+        Return the equivalent filter in canonical form.
+        """
+        return self
+
+    def render(self):
+        """
+        Return the filter in the pyami filter string syntax.
+        """
+        raise NotImplementedError
+
+    def names(self):
+        """
+        Return the set of ami names used in the filter.
+        """
+        raise NotImplementedError
+
+    def evaluate(self, data, event_codes=None):
+        """
+        Check which shots pass the filter.
+
+        Parameters
+        ----------
+        data: ``dict``
+            Mapping of ami name to an array with one value per shot.
+
+        event_codes: ``dict``, optional
+            Mapping of event code to an array with one ``bool`` per shot
+            that is ``True`` when the code was present. Event codes missing
+            from both this and ``data`` are treated as never present.
+
+        Returns
+        -------
+        passed: ``np.ndarray``
+            One ``bool`` per shot.
+        """
+        return self._evaluate(_shot_data(data, event_codes))
+
+    def _evaluate(self, data):
+        raise NotImplementedError
+
+    def __and__(self, other):
+        return And(self, other)
+
+    def __or__(self, other):
+        return Or(self, other)
+
+    def __eq__(self, other):
+        if not isinstance(other, Filter):
+            return NotImplemented
+        return self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __str__(self):
+        return self.render()
+
+    def __repr__(self):
+        return '{}({!r})'.format(type(self).__name__, self.render())
+
+
+class Range(Filter):
+    """
+    Filter that passes when an ami value is between two bounds.
+
+    Parameters
+    ----------
+    name: ``str``
+        The name of the value in ami.
+
+    lower: ``float``
+        The lower bound for the value to pass.
+
+    upper: ``float``
+        The upper bound for the value to pass.
+    """
+    def __init__(self, name, lower, upper):
+        self.name = name
+        self.lower = lower
+        self.upper = upper
+
+    def key(self):
+        return (1, self.name, float(self.lower), float(self.upper))
+
+    def render(self):
+        return '{}<{}<{}'.format(_format_bound(self.lower), self.name,
+                                 _format_bound(self.upper))
+
+    def names(self):
+        return {self.name}
+
+    def _evaluate(self, data):
+        try:
+            values = data[self.name]
+        except KeyError:
+            raise KeyError('No shot data for {} in filter {}'
+                           .format(self.name, self.render())) from None
+        return (self.lower < values) & (values < self.upper)
+
+
+class EventCode(Range):
+    """
+    Filter that passes when an event code is present.
+
+    Parameters
+    ----------
+    code: ``int``
+        The event code.
+    """
+    def __init__(self, code):
+        self.code = code
+        super().__init__(EVR_NAME.format(code), 0.1, 2)
+
+
+class _Compound(Filter):
+    op = None
+
+    def __init__(self, *terms):
+        if not terms:
+            raise ValueError('{} needs at least one term'
+                             .format(type(self).__name__))
+        for term in terms:
+            if not isinstance(term, Filter):
+                raise TypeError('Expected Filter, got {!r}'.format(term))
+        self.terms = terms
+
+    def canonical(self):
+        terms = []
+        seen = set()
+        for term in self.terms:
+            term = term.canonical()
+            # Flatten (a&b)&c into a&b&c
+            if type(term) is type(self):
+                sub_terms = term.terms
+            else:
+                sub_terms = (term,)
+            for sub in sub_terms:
+                key = sub.key()
+                if key not in seen:
+                    seen.add(key)
+                    terms.append(sub)
+        if len(terms) == 1:
+            return terms[0]
+        terms.sort(key=lambda term: term.key())
+        return type(self)(*terms)
+
+    def key(self):
+        canon = self.canonical()
+        if not isinstance(canon, _Compound):
+            return canon.key()
+        return (0, canon.op, tuple(term.key() for term in canon.terms))
+
+    def render(self):
+        if len(self.terms) == 1:
+            return self.terms[0].render()
+        sep = ')' + self.op + '('
+        return '(' + sep.join(term.render() for term in self.terms) + ')'
+
+    def names(self):
+        return set().union(*(term.names() for term in self.terms))
+
+    def _evaluate(self, data):
+        return self._reduce([term._evaluate(data) for term in self.terms])
+
+
+class And(_Compound):
+    """
+    Filter that passes when all of its terms pass.
+    """
+    op = '&'
+    _reduce = staticmethod(np.logical_and.reduce)
+
+
+class Or(_Compound):
+    """
+    Filter that passes when any of its terms pass.
+    """
+    op = '|'
+    _reduce = staticmethod(np.logical_or.reduce)
+
+
+def parse_filter(filter_string):
+    """
+    Build a filter expression from a pyami filter string.
+
+    Parameters
+    ----------
+    filter_string: ``str``
+        A filter like ``'(0<DET<1)&(0.1<DAQ:EVR:Evt162<2)'``.
+
+    Returns
+    -------
+    filt: `Filter`
+
+    Raises
+    ------
+    ValueError
+        If the string is not a valid filter.
+    """
+    text = ''.join(filter_string.split())
+    filt, pos = _parse_expr(text, 0)
+    if pos != len(text):
+        raise ValueError('Unexpected {!r} at position {} of filter {!r}'
+                         .format(text[pos], pos, filter_string))
+    return filt
+
+
+def _parse_expr(text, pos):
+    terms = []
+    op = None
+    while True:
+        term, pos = _parse_term(text, pos)
+        terms.append(term)
+        if pos >= len(text) or text[pos] not in '&|':
+            break
+        if op is None:
+            op = text[pos]
+        elif op != text[pos]:
+            raise ValueError('Mixed & and | without parentheses in filter '
+                             '{!r}'.format(text))
+        pos += 1
+    if op is None:
+        return terms[0], pos
+    elif op == '&':
+        return And(*terms), pos
+    else:
+        return Or(*terms), pos
+
+
+def _parse_term(text, pos):
+    if text.startswith('(', pos):
+        filt, pos = _parse_expr(text, pos + 1)
+        if not text.startswith(')', pos):
+            raise ValueError('Missing ) in filter {!r}'.format(text))
+        return filt, pos + 1
+    end = pos
+    while end < len(text) and text[end] not in '()&|':
+        end += 1
+    parts = text[pos:end].split('<')
+    if len(parts) != 3 or not parts[1]:
+        raise ValueError('Expected lower<name<upper in filter {!r}, got {!r}'
+                         .format(text, text[pos:end]))
+    lower, name, upper = parts
+    lower = _parse_number(lower)
+    upper = _parse_number(upper)
+    return Range(name, lower, upper), end
+
+
+def _format_bound(value):
+    """
+    Render a bound so that equal values, like ``1`` and ``1.0``, match.
+    """
+    value = float(value)
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _parse_number(text):
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def _as_filter(filt):
+    if isinstance(filt, Filter):
+        return filt
+    return parse_filter(filt)
+
+
+class _ShotData(dict):
+    """
+    Per-shot arrays where unknown event codes read as never present.
+    """
+    def __init__(self, data, shots):
+        super().__init__(data)
+        self.shots = shots
+
+    def __missing__(self, name):
+        if name.startswith(EVR_NAME.format('')):
+            return np.zeros(self.shots)
+        raise KeyError(name)
+
+
+def _shot_data(data, event_codes):
+    arrays = {name: np.asarray(values, dtype=float)
+              for name, values in data.items()}
+    for code, present in (event_codes or {}).items():
+        arrays[EVR_NAME.format(code)] = np.asarray(present, dtype=float)
+    lengths = {len(values) for values in arrays.values()}
+    if len(lengths) > 1:
+        raise ValueError('Shot arrays have different lengths: {}'
+                         .format(sorted(lengths)))
+    return _ShotData(arrays, lengths.pop() if lengths else 0)
+
+
+def pass_rate(filt, data, event_codes=None):
+    """
+    Estimate the fraction of shots that will pass a filter.
+
+    Parameters
+    ----------
+    filt: `Filter` or ``str``
+        The filter, for example the output of ``dets_filter``.
+
+    data: ``dict``
+        Mapping of ami name to an array of recorded or simulated values, one
+        per shot.
+
+    event_codes: ``dict``, optional
+        Mapping of event code to an array with one ``bool`` per shot.
+
+    Returns
+    -------
+    rate: ``float``
+        The fraction of the shots that passed, or ``nan`` with no shots.
+    """
+    passed = _as_filter(filt).evaluate(data, event_codes=event_codes)
+    if not len(passed):
+        return np.nan
+    return np.count_nonzero(passed) / len(passed)
+
+
+def expected_duration(filt, events, data, event_codes=None, rate=SHOT_RATE):
+    """
+    Estimate how long it will take to collect ``events`` shots that pass.
+
+    This is the wall time of a run that uses ``use_l3t=True`` with an
+    ``events`` count.
+
+    Parameters
+    ----------
+    filt: `Filter` or ``str``
+        The filter, for example the output of ``dets_filter``.
+
+    events: ``int``
+        The number of events that need to pass.
+
+    data: ``dict``
+        Mapping of ami name to an array of recorded or simulated values, one
+        per shot.
+
+    event_codes: ``dict``, optional
+        Mapping of event code to an array with one ``bool`` per shot.
+
+    rate: ``float``, optional
+        The shot rate in Hz, `SHOT_RATE` by default.
+
+    Returns
+    -------
+    duration: ``float``
+        Expected seconds, or ``inf`` if no shots passed.
+    """
+    passed = pass_rate(filt, data, event_codes=event_codes)
+    if not passed:
+        return np.inf
+    return events / (rate * passed)
@@ -5,10 +5,11 @@ from bluesky.plan_stubs import configure
 from bluesky.preprocessors import fly_during_wrapper, stage_wrapper
 from bluesky.utils import make_decorator
 
-from .daq import get_daq
+from .daq import DaqGroup, get_daq
 
 
-def daq_during_wrapper(plan, record=None, use_l3t=False, controls=None):
+def daq_during_wrapper(plan, record=None, use_l3t=False, controls=None,
+                       daqs=None):
     """
     Run a plan with the `Daq`.
 
@@ -43,8 +44,22 @@ def daq_during_wrapper(plan, record=None, use_l3t=False, controls=None):
         ``device.value`` for quantities to use and we will update these
         values each time begin is called. To provide a list, all devices
         must have a ``name`` attribute.
+
+    daqs: ``list`` of `Daq`, or `DaqGroup`, optional
+        The daqs to run with the plan. These are configured, started and
+        ended together as a `DaqGroup`. Defaults to the `Daq` from
+        ``get_daq``.
     """
-    daq = get_daq()
+    if daqs is None:
+        daq = get_daq()
+    elif isinstance(daqs, DaqGroup):
+        daq = daqs
+    else:
+        daqs = list(daqs)
+        if len(daqs) == 1:
+            daq = daqs[0]
+        else:
+            daq = DaqGroup(daqs)
     yield from configure(daq, events=None, duration=None, record=record,
                          use_l3t=use_l3t, controls=controls)
     yield from stage_wrapper(fly_during_wrapper(plan, flyers=[daq]), [daq])
@@ -35,6 +35,11 @@ class ScanVars(Device, CallbackBase):
     i_start: ``int``, optional
         The starting count for the i_step tracker. This defaults to zero,
         which is offset by one from the one-indexed bluesky counter.
+
+    daq: `Daq`, optional
+        The daq whose ``events`` setting is reported as the number of shots
+        per step. Defaults to the `Daq` from ``get_daq`` at the start of each
+        run.
     """
     i_step = Cpt(EpicsSignal, ':ISTEP')
     is_scan = Cpt(EpicsSignal, ':ISSCAN')
@@ -50,8 +55,9 @@ class ScanVars(Device, CallbackBase):
     n_steps = Cpt(EpicsSignal, ':NSTEPS')
     n_shots = Cpt(EpicsSignal, ':NSHOTS')
 
-    def __init__(self, prefix, *, name, RE, i_start=0, **kwargs):
+    def __init__(self, prefix, *, name, RE, i_start=0, daq=None, **kwargs):
         super().__init__(prefix, name=name, **kwargs)
+        self._daq = daq
         self._cbid = None
         self._RE = RE
         self._i_start = i_start
@@ -115,7 +121,7 @@ class ScanVars(Device, CallbackBase):
                 logger.debug('Skip n_steps, no "plan_args" "num" in start doc')
 
             # inspect the daq
-            daq = get_daq()
+            daq = self._daq if self._daq is not None else get_daq()
             if daq is None:
                 logger.debug('Skip n_shots, no daq')
             else:
@@ -0,0 +1,119 @@
+"""
+Clocks for the simulated daq.
+
+The simulated `pcdsdaq.sim.pydaq.Control` asks its clock for the time and
+waits on its clock for runs to end. Swap in a `VirtualClock` to run long
+simulated acquisitions faster than real time, or a `ManualClock` to step
+time by hand in tests.
+"""
+import math
+import threading
+import time
+
+
+class RealClock:
+    """
+    The wall clock.
+    """
+    def time(self):
+        """
+        Current time in seconds.
+        """
+        return time.time()
+
+    def sleep(self, seconds):
+        """
+        Block for ``seconds`` of clock time.
+        """
+        time.sleep(seconds)
+
+    def wait_until(self, deadline, event):
+        """
+        Block until the clock reaches ``deadline`` or ``event`` is set.
+
+        Returns
+        -------
+        is_set: ``bool``
+            ``True`` if we stopped waiting because ``event`` was set.
+        """
+        while not event.is_set():
+            remaining = deadline - self.time()
+            if remaining <= 0:
+                break
+            elif math.isinf(remaining):
+                event.wait()
+            else:
+                event.wait(self._real_seconds(remaining))
+        return event.is_set()
+
+    def notify(self):
+        """
+        Wake up `wait_until` calls to check their event again.
+        """
+        pass
+
+    def _real_seconds(self, seconds):
+        return seconds
+
+
+class VirtualClock(RealClock):
+    """
+    A clock that runs ``speed`` times faster than the wall clock.
+
+    Parameters
+    ----------
+    speed: ``float``, optional
+        How many clock seconds pass in each real second.
+    """
+    def __init__(self, speed=1):
+        self.speed = speed
+        self._offset = time.time()
+        self._start = time.monotonic()
+
+    def time(self):
+        return self._offset + (time.monotonic() - self._start) * self.speed
+
+    def sleep(self, seconds):
+        time.sleep(self._real_seconds(seconds))
+
+    def _real_seconds(self, seconds):
+        return seconds / self.speed
+
+
+class ManualClock(RealClock):
+    """
+    A clock that only moves when `advance` is called.
+
+    Parameters
+    ----------
+    start: ``float``, optional
+        The starting time.
+    """
+    def __init__(self, start=0):
+        self._now = start
+        self._cond = threading.Condition()
+
+    def time(self):
+        with self._cond:
+            return self._now
+
+    def advance(self, seconds):
+        """
+        Move the clock forward, finishing any waits that are now done.
+        """
+        with self._cond:
+            self._now += seconds
+            self._cond.notify_all()
+
+    def sleep(self, seconds):
+        self.wait_until(self.time() + seconds, threading.Event())
+
+    def wait_until(self, deadline, event):
+        with self._cond:
+            while not event.is_set() and self._now < deadline:
+                self._cond.wait()
+        return event.is_set()
+
+    def notify(self):
+        with self._cond:
+            self._cond.notify_all()
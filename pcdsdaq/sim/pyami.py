@@ -1,13 +1,17 @@
 import logging
-import random
+import time
 
 import numpy as np
 
+from ..filters import parse_filter
+
 connect_success = True
 logger = logging.getLogger(__name__)
 
 set_l3t_count = 0
 clear_l3t_count = 0
+# Simulated shots per second for new or cleared entries
+shot_rate = 120
 
 
 def connect(ami_str):
@@ -20,6 +24,8 @@ def connect(ami_str):
 
 def set_l3t(filter_string, l3t_file):
     global set_l3t_count
+    # Fail on filter strings that we could not evaluate
+    parse_filter(filter_string)
     set_l3t_count += 1
 
 
@@ -29,6 +35,14 @@ def clear_l3t():
 
 
 class Entry:
+    """
+    Simulated pyami scalar that accumulates uniform random shots.
+
+    Shots arrive at the module-level ``shot_rate`` from the last `clear`.
+    They are only generated when `get` is called, and only the ones since
+    the previous `get`, and are folded into running statistics so the
+    entry holds no per-shot data.
+    """
     _connected = False
 
     def __init__(self, ami_name, ami_type, filter_string=None):
@@ -39,16 +53,53 @@ class Entry:
         if not Entry._connected:
             raise RuntimeError('simulated fail: did not call connect')
         self._filt = filter_string
+        if filter_string:
+            self._filter = parse_filter(filter_string)
+        else:
+            self._filter = None
         self.clear()
 
     def get(self):
-        if len(self._values):
-            return dict(mean=np.mean(self._values),
-                        rms=np.std(self._values),
-                        entries=len(self._values))
+        self._accumulate()
+        if self._entries:
+            return dict(mean=self._mean,
+                        rms=np.sqrt(self._m2 / self._entries),
+                        entries=self._entries)
         else:
             return dict(mean=0, rms=0, entries=0)
 
     def clear(self):
-        self._count = random.randint(1, 100)
-        self._values = [random.random() for i in range(self._count)]
+        self._rate = shot_rate
+        self._start = time.monotonic()
+        self._shots = 0
+        self._entries = 0
+        self._mean = 0.
+        self._m2 = 0.
+
+    def _accumulate(self):
+        """
+        Generate the shots since the last call and add them to the stats.
+        """
+        due = int((time.monotonic() - self._start) * self._rate)
+        count = due - self._shots
+        if count <= 0:
+            return
+        self._shots = due
+        values = np.random.random(count)
+        if self._filter is not None:
+            # Every other value in the filter is also uniform on [0, 1)
+            data = {name: np.random.random(count)
+                    for name in self._filter.names()}
+            data[self._ami_name] = values
+            values = values[self._filter.evaluate(data)]
+        if not len(values):
+            return
+        # Chan et al. pairwise update of the running mean and M2
+        num = len(values)
+        mean = values.mean()
+        m2 = ((values - mean)**2).sum()
+        total = self._entries + num
+        delta = mean - self._mean
+        self._mean += delta * num / total
+        self._m2 += m2 + delta**2 * self._entries * num / total
+        self._entries = total
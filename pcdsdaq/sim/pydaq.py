@@ -1,10 +1,12 @@
+import heapq
+import itertools
 import numbers
-import time
 import threading
 import logging
 
 from pcdsdaq.daq import Daq
 from pcdsdaq.ext_scripts import hutch_name, get_run_number  # NOQA
+from .clock import RealClock
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +17,12 @@ class SimNoDaq(Daq):
 
 
 conn_err = None
+# If set, only this platform will accept connections
+conn_platform = None
+# If True, runs with a finite length end as soon as they begin
+zero_latency = False
+# Where Control gets the time. See pcdsdaq.sim.clock for faster clocks.
+clock = RealClock()
 
 
 class Control:
@@ -43,12 +51,19 @@ class Control:
     )
     _run_number = 0
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, host=None, platform=0):
+        self._host = host
+        self._platform = platform
         self._duration = None
         self._time_remaining = 0
         self._done_flag = threading.Event()
         self._record = False
         self._begin_delay = 0
+        # Begins fail if they come within this many seconds of a stop
+        self._stop_begin_gap = 0
+        self._last_stop = 0
+        # Incremented every begin so stale scheduled run ends are ignored
+        self._run_id = 0
 
     def _do_transition(self, transition):
         logger.debug('Doing transition %s from state %s',
@@ -73,6 +88,8 @@ class Control:
         logger.debug('SimControl.connect()')
         if conn_err is not None:
             raise RuntimeError(conn_err)
+        if conn_platform is not None and self._platform != conn_platform:
+            raise RuntimeError('Connect failed')
         self._do_transition('connect')
 
     def disconnect(self):
@@ -110,6 +127,8 @@ class Control:
                       'monitors=%s)'),
                      events, l1t_events, l3t_events, duration, controls,
                      monitors)
+        if clock.time() - self._last_stop < self._stop_begin_gap:
+            raise RuntimeError('simulated fail: begin too soon after stop')
         if self._do_transition('begin'):
             dur = self._pick_duration(events, l1t_events, l3t_events, duration)
             if dur is None:
@@ -121,9 +140,14 @@ class Control:
             if self._begin_delay:
                 delay = self._begin_delay
                 self._begin_delay = 0
-                time.sleep(delay)
-            thr = threading.Thread(target=self._begin_thread, args=(dur,))
-            thr.start()
+                clock.sleep(delay)
+            self._run_id += 1
+            if dur == float('inf'):
+                return
+            if zero_latency:
+                self.stop()
+                return
+            _scheduler.schedule(clock.time() + dur, self, self._run_id)
 
     def _pick_duration(self, events, l1t_events, l3t_events, duration):
         logger.debug('SimControl._pick_duration(%s, %s, %s, %s)', events,
@@ -158,35 +182,29 @@ class Control:
 
     def stop(self):
         logger.debug('SimControl.stop()')
-        self._do_transition('stop')
+        if self._do_transition('stop'):
+            self._last_stop = clock.time()
         self._time_remaining = 0
         self._done_flag.set()
+        clock.notify()
 
     def endrun(self):
         logger.debug('SimControl.endrun()')
         self._do_transition('endrun')
         self._time_remaining = 0
         self._done_flag.set()
+        clock.notify()
 
-    def _begin_thread(self, duration):
-        logger.debug('SimControl._begin_thread(%s)', duration)
-        start = time.time()
-        initial_duration = duration
-        interrupted = False
-        dt = 0.1
-        while duration > 0:
-            duration -= dt
-            if self._done_flag.wait(dt):
-                interrupted = True
-                break
-        if not interrupted:
+    def _finish_run(self, run_id):
+        """
+        Called by the scheduler when run ``run_id`` has acquired everything.
+        """
+        if run_id == self._run_id and self._state == 'Running':
+            logger.debug('SimControl run %s finished', run_id)
             try:
                 self.stop()
             except Exception:
                 pass
-        end = time.time()
-        logger.debug('%ss elapsed in SimControl._begin_thread(%s)',
-                     end-start, initial_duration)
 
     def end(self):
         logger.debug('SimControl.end()')
@@ -195,6 +213,61 @@ class Control:
         self._done_flag.wait()
 
 
+class _RunScheduler:
+    """
+    One thread that ends the runs of every simulated `Control`.
+
+    Run end times are kept in a heap in clock time. The thread sleeps on the
+    clock until the earliest one, or until a new run is scheduled.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._heap = []
+        self._seq = itertools.count()
+        self._wake = threading.Event()
+        self._thread = None
+        self._clock = None
+
+    def schedule(self, deadline, control, run_id):
+        """
+        End ``control``'s run ``run_id`` at clock time ``deadline``.
+        """
+        with self._lock:
+            heapq.heappush(self._heap, (deadline, next(self._seq), control,
+                                        run_id))
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run,
+                                                name='sim_daq_scheduler',
+                                                daemon=True)
+                self._thread.start()
+            self._wake.set()
+            waiting = self._clock
+        if waiting is not None:
+            waiting.notify()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                self._wake.clear()
+                sim_clock = clock
+                self._clock = sim_clock
+                now = sim_clock.time()
+                due = []
+                while self._heap and self._heap[0][0] <= now:
+                    due.append(heapq.heappop(self._heap))
+                if self._heap:
+                    deadline = self._heap[0][0]
+                else:
+                    deadline = float('inf')
+            for _, _, control, run_id in due:
+                control._finish_run(run_id)
+            if not due:
+                sim_clock.wait_until(deadline, self._wake)
+
+
+_scheduler = _RunScheduler()
+
+
 def sim_hutch_name():
     return 'tst'
 
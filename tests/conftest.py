@@ -7,6 +7,7 @@ import pcdsdaq.sim.pydaq as sim_pydaq
 from pcdsdaq.ami import (AmiDet, _reset_globals as ami_reset_globals)
 from pcdsdaq.daq import Daq
 from pcdsdaq.sim import set_sim_mode
+from pcdsdaq.sim.clock import RealClock
 from pcdsdaq.sim.pydaq import SimNoDaq
 
 import pytest
@@ -30,7 +31,11 @@ def nosim(reset):
 @pytest.fixture(scope='function')
 def daq(RE, sim):
     sim_pydaq.conn_err = None
+    sim_pydaq.conn_platform = None
+    sim_pydaq.zero_latency = False
+    sim_pydaq.clock = RealClock()
     daq_module.BEGIN_THROTTLE = 0
+    daq_module.HINTS_FILE = None
     daq = Daq(RE=RE)
     yield daq
     try:
@@ -1,32 +1,58 @@
 import importlib
 import logging
+import threading
+import time
 
+import numpy as np
 import pytest
 
 from bluesky.callbacks import collector
 from bluesky.plans import count
+from ophyd.device import Staged
 
 import pcdsdaq.ami
 import pcdsdaq.sim.pyami as sim_pyami
-from pcdsdaq.ami import (AmiDet, auto_setup_pyami,
+from pcdsdaq.ami import (AmiDet, AmiDetGroup, auto_setup_pyami,
                          set_monitor_det, set_pyami_filter,
-                         dets_filter, concat_filter_strings)
+                         set_l3t_file, set_pyami_proxy,
+                         dets_filter, concat_filter_strings,
+                         duration_status)
 
 logger = logging.getLogger(__name__)
 
 
-def test_ami_basic(ami_det):
+def test_ami_basic(ami_det, monkeypatch):
     logger.debug('test_ami_basic')
     ami_det.stage()
     ami_det.trigger()
+    time.sleep(0.1)
     stats = ami_det.get()
     assert stats.entries > 0
-    ami_det._entry._values = []
+    monkeypatch.setattr(sim_pyami, 'shot_rate', 0)
+    ami_det._entry.clear()
     # Should not error with no values collected
     stats = ami_det.get()
+    assert stats.entries == 0
 
 
 @pytest.mark.timeout(60)
+def test_sim_entry_streaming(sim, monkeypatch):
+    logger.debug('test_sim_entry_streaming')
+    monkeypatch.setattr(sim_pyami, 'shot_rate', 10000)
+    sim_pyami.connect('')
+    entry = sim_pyami.Entry('TST', 'Scalar')
+    time.sleep(0.05)
+    first = entry.get()
+    time.sleep(0.05)
+    second = entry.get()
+    assert 0 < first['entries'] < second['entries']
+    assert second['entries'] == entry._shots
+    assert second['mean'] == pytest.approx(0.5, abs=0.05)
+    assert second['rms'] == pytest.approx(np.sqrt(1/12), abs=0.03)
+    entry.clear()
+    assert entry.get()['entries'] < first['entries']
+
+
 def test_ami_scan(ami_det, RE):
     logger.debug('test_ami_scan')
     ami_det.min_duration = 1
@@ -48,11 +74,11 @@ def test_normalize_scan(ami_det, ami_det_2, RE):
     RE(count([ami_det_2], num=5))
 
 
-def test_normalize_error(ami_det, ami_det_2):
+def test_normalize_error(ami_det, ami_det_2, monkeypatch):
     logger.debug('test_normalize_error')
     set_monitor_det(ami_det_2)
+    monkeypatch.setattr(sim_pyami, 'shot_rate', 0)
     ami_det_2.stage()
-    ami_det_2._entry._values = []
     with pytest.raises(RuntimeError):
         ami_det.get()
     ami_det.stage()
@@ -60,6 +86,137 @@ def test_normalize_error(ami_det, ami_det_2):
     assert ami_det.mean_mon.get() == 0
 
 
+def test_normalize_shared_read(ami_det_2, RE, monkeypatch):
+    logger.debug('test_normalize_shared_read')
+    set_monitor_det(ami_det_2)
+    dets = [AmiDet('DET{}'.format(i), name='det{}'.format(i))
+            for i in range(3)]
+    calls = []
+    entry_get = sim_pyami.Entry.get
+
+    def counting_get(self):
+        calls.append(self._ami_name)
+        return entry_get(self)
+
+    monkeypatch.setattr(sim_pyami.Entry, 'get', counting_get)
+    docs = []
+    num = 3
+    RE(count(dets + [ami_det_2], num=num),
+       {'event': lambda name, doc: docs.append(doc)})
+    # One monitor read per event, no matter how many dets normalize to it
+    assert calls.count('TST2') == num
+    for doc in docs:
+        mon_mean = doc['data'][ami_det_2.mean_raw.name]
+        for det in dets:
+            assert doc['data'][det.mean_mon.name] == mon_mean
+
+
+def test_ami_det_group(ami_det, ami_det_2, RE):
+    logger.debug('test_ami_det_group')
+    set_monitor_det(ami_det_2)
+    dets = [AmiDet('DET{}'.format(i), name='det{}'.format(i))
+            for i in range(3)]
+    dets.append(AmiDet('DET3', name='det3', normalize=False))
+    dets.append(ami_det)
+    group = AmiDetGroup(dets, name='group')
+    assert group.describe().keys() == set().union(*(det.describe().keys()
+                                                    for det in dets))
+    group.stage()
+    assert ami_det_2._staged == Staged.yes
+    group.trigger().wait(timeout=1)
+    time.sleep(0.1)
+    # Freeze the sim entries so the group and the dets see the same data
+    for det in dets + [ami_det_2]:
+        det._entry.get()
+        det._entry._rate = 0
+    # Check the no data case too
+    ami_det._entry.clear()
+    ami_det._entry._rate = 0
+    data = group.read()
+    assert data.keys() == group.describe().keys()
+    for det in dets:
+        expected = det.read()
+        for key, value in expected.items():
+            assert data[key]['value'] == pytest.approx(value['value'],
+                                                       nan_ok=True)
+    group.unstage()
+    assert ami_det_2._staged == Staged.no
+    with pytest.raises(RuntimeError):
+        group.read()
+
+    coll = []
+    RE(count([group], num=3),
+       {'event': lambda name, doc: coll.append(doc['data'])})
+    assert len(coll) == 3
+    assert ami_det.mean.name in coll[0]
+
+
+def test_shared_trigger_timer(ami_det):
+    logger.debug('test_shared_trigger_timer')
+    dets = [AmiDet('DET{}'.format(i), name='det{}'.format(i),
+                   min_duration=0.2, normalize=False)
+            for i in range(30)]
+    for det in dets:
+        det.stage()
+    threads = threading.active_count()
+    statuses = [det.trigger() for det in dets]
+    # Everything shares the timer thread and, here, a single status
+    assert threading.active_count() <= threads + 1
+    assert all(status is statuses[0] for status in statuses)
+    assert not statuses[0].done
+    statuses[0].wait(timeout=1)
+    assert statuses[0].success
+    # Different durations are separate
+    short = duration_status(0.05)
+    assert short is not duration_status(0.1)
+    short.wait(timeout=1)
+    immediate = duration_status(0)
+    immediate.wait(timeout=1)
+    assert immediate.success
+    for det in dets:
+        det.unstage()
+
+
+def test_entry_pool(ami_det, monkeypatch):
+    logger.debug('test_entry_pool')
+    ami_det.stage()
+    entry = ami_det._entry
+    ami_det.unstage()
+    assert len(pcdsdaq.ami.entry_pool) == 1
+    ami_det.stage()
+    assert ami_det._entry is entry
+    assert not pcdsdaq.ami.entry_pool
+    ami_det.unstage()
+    # A different filter gets a different entry
+    ami_det.filter_string = '4<x<5'
+    ami_det.stage()
+    assert ami_det._entry is not entry
+    assert ami_det._entry._filt == '4<x<5'
+    ami_det.unstage()
+    assert len(pcdsdaq.ami.entry_pool) == 2
+    # Size limit drops the least recently used
+    monkeypatch.setattr(pcdsdaq.ami, 'ENTRY_POOL_SIZE', 1)
+    ami_det.filter_string = None
+    ami_det.stage()
+    ami_det.unstage()
+    assert list(pcdsdaq.ami.entry_pool) == [('TST', 'Scalar', None)]
+    # Idle timeout drops everything old
+    monkeypatch.setattr(pcdsdaq.ami, 'ENTRY_IDLE_TIMEOUT', 0)
+    ami_det.stage()
+    assert ami_det._entry is not entry
+    assert not pcdsdaq.ami.entry_pool
+    ami_det.unstage()
+    # Entries from the old pyami connection are not reused
+    monkeypatch.setattr(pcdsdaq.ami, 'ENTRY_IDLE_TIMEOUT', 60)
+    ami_det.stage()
+    entry = ami_det._entry
+    ami_det.unstage()
+    set_pyami_proxy('other')
+    ami_det.stage()
+    assert ami_det._entry is not entry
+    ami_det.unstage()
+
+
 def test_ami_stage(ami_det):
     logger.debug('test_ami_stage')
     assert ami_det._entry is None
@@ -79,6 +236,59 @@ def test_ami_stage(ami_det):
     assert ami_det._entry is None
 
 
+def test_ami_stage_monitor(ami_det, ami_det_2, monkeypatch):
+    logger.debug('test_ami_stage_monitor')
+    set_monitor_det(ami_det_2)
+    staged = ami_det.stage()
+    assert ami_det_2 in staged
+    assert ami_det_2._staged == Staged.yes
+    # Already staged as a monitor, staging again is fine
+    assert ami_det_2.stage() == [ami_det_2]
+    created = []
+    entry_init = sim_pyami.Entry.__init__
+
+    def slow_init(self, *args, **kwargs):
+        created.append(threading.current_thread().name)
+        time.sleep(0.1)
+        entry_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(sim_pyami.Entry, '__init__', slow_init)
+    ami_det.trigger()
+    assert not created
+    ami_det.unstage()
+    assert ami_det_2._staged == Staged.no
+
+    # The group creates the entries concurrently, monitors first
+    pcdsdaq.ami.clear_entry_pool()
+    dets = [AmiDet('DET{}'.format(i), name='det{}'.format(i))
+            for i in range(8)]
+    group = AmiDetGroup(dets, name='group')
+    start = time.monotonic()
+    group.stage()
+    assert time.monotonic() - start < 0.5
+    assert len(created) == 9
+    assert all(name.startswith('ami_stage') for name in created)
+    assert all(det._staged == Staged.yes for det in dets + [ami_det_2])
+    group.trigger()
+    assert len(created) == 9
+    group.unstage()
+    assert all(det._staged == Staged.no for det in dets + [ami_det_2])
+
+    # A monitor staged by someone else stays staged
+    monkeypatch.setattr(sim_pyami.Entry, '__init__', entry_init)
+    ami_det_2.stage()
+    ami_det.stage()
+    ami_det.unstage()
+    assert ami_det_2._staged == Staged.yes
+    staged = group.stage()
+    assert len(staged) == len(set(staged))
+    assert ami_det_2 not in staged
+    group.unstage()
+    assert all(det._staged == Staged.no for det in dets)
+    assert ami_det_2._staged == Staged.yes
+    ami_det_2.unstage()
+
+
 def test_ami_trigger_errors(ami_det):
     logger.debug('test_ami_trigger_errors')
     with pytest.raises(RuntimeError):
@@ -154,6 +364,67 @@ def test_set_pyami_filter_daq(daq, ami_det):
     assert sim_pyami.clear_l3t_count == 1
 
 
+def test_set_pyami_filter_skip(daq, ami_det):
+    logger.debug('test_set_pyami_filter_skip')
+    set_pyami_filter(ami_det, 0, 1)
+    set_pyami_filter(ami_det, 0, 1)
+    daq.set_filter(ami_det, 0, 1)
+    assert sim_pyami.set_l3t_count == 1
+    assert pcdsdaq.ami.l3t_push_count == 1
+    assert pcdsdaq.ami.l3t_skip_count == 2
+    daq.set_filter(ami_det, 0, 1, force=True)
+    assert sim_pyami.set_l3t_count == 2
+    set_pyami_filter(ami_det, 0, 2)
+    assert sim_pyami.set_l3t_count == 3
+    set_pyami_filter()
+    set_pyami_filter()
+    assert sim_pyami.clear_l3t_count == 1
+    assert pcdsdaq.ami.l3t_push_count == 4
+    assert pcdsdaq.ami.l3t_skip_count == 3
+
+
+def test_set_pyami_filter_new_target(ami_det):
+    logger.debug('test_set_pyami_filter_new_target')
+    set_pyami_filter(ami_det, 0, 1)
+    assert sim_pyami.set_l3t_count == 1
+    # A new file or connection needs the filter again
+    set_l3t_file('/tmp/other_l3t.txt')
+    set_pyami_filter(ami_det, 0, 1)
+    assert sim_pyami.set_l3t_count == 2
+    set_pyami_filter(ami_det, 0, 1)
+    assert sim_pyami.set_l3t_count == 2
+    set_pyami_proxy('other')
+    set_pyami_filter(ami_det, 0, 1)
+    assert sim_pyami.set_l3t_count == 3
+
+
+def test_set_pyami_filter_canonical(ami_det):
+    logger.debug('test_set_pyami_filter_canonical')
+    set_pyami_filter(ami_det, 0, 1, 'OTHER', 2, 3, event_codes=[40])
+    set_pyami_filter('OTHER', 2, 3, ami_det, 0, 1, ami_det, 0, 1,
+                     event_codes=[40])
+    assert sim_pyami.set_l3t_count == 1
+    assert (dets_filter(ami_det, 0, 1, 'OTHER', 2, 3) ==
+            dets_filter('OTHER', 2, 3, ami_det, 0, 1))
+    # Int and float bounds are the same filter
+    assert dets_filter(ami_det, 0, 1) == dets_filter(ami_det, 0.0, 1.0)
+    set_pyami_filter(ami_det, 0.0, 1.0, 'OTHER', 2.0, 3, event_codes=[40])
+    assert sim_pyami.set_l3t_count == 1
+    with pytest.raises(ValueError):
+        dets_filter(ami_det, 0, 1, operator='^')
+
+
+def test_sim_pyami_filter(ami_det):
+    logger.debug('test_sim_pyami_filter')
+    set_pyami_filter(ami_det, 0, 0.5)
+    ami_det.stage()
+    ami_det.trigger()
+    time.sleep(0.1)
+    stats = ami_det._entry.get()
+    assert 0 < stats['entries'] < ami_det._entry._shots
+    assert stats['mean'] < 0.5
+
+
 def test_set_monitor_daq(daq, ami_det):
     logger.debug('test_set_monitor_daq')
     daq.set_monitor(ami_det)
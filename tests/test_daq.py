@@ -1,8 +1,10 @@
+import asyncio
 import logging
 import os
 import os.path
 import signal
 import time
+import threading
 from threading import Thread
 
 import pytest
@@ -14,7 +16,9 @@ from ophyd.status import wait as status_wait
 import pcdsdaq.sim.pydaq as sim_pydaq
 import pcdsdaq.ext_scripts as ext
 from pcdsdaq import daq as daq_module
-from pcdsdaq.daq import BEGIN_TIMEOUT, StateTransitionError, DaqTimeoutError
+from pcdsdaq.daq import (BEGIN_TIMEOUT, StateTransitionError, DaqTimeoutError,
+                         Daq, DaqGroup)
+from pcdsdaq.sim.clock import ManualClock, VirtualClock
 
 logger = logging.getLogger(__name__)
 
@@ -46,6 +50,68 @@ def test_connect_errors(daq):
         daq.begin()
 
 
+def test_connect_platform(daq, monkeypatch, tmp_path):
+    logger.debug('test_connect_platform')
+    monkeypatch.setattr(daq_module, 'HINTS_FILE', str(tmp_path / 'hints'))
+    monkeypatch.setattr(sim_pydaq, 'conn_platform', 4)
+    daq.connect()
+    assert daq.connected
+    assert daq._control._platform == 4
+    assert daq_module.load_hints(daq._host) == dict(platform=4)
+
+    # The hinted platform gets tried on its own first
+    daq.disconnect()
+    monkeypatch.setattr(sim_pydaq, 'conn_platform', None)
+    tried = []
+
+    class RecordControl(sim_pydaq.Control):
+        def connect(self):
+            tried.append(self._platform)
+            if self._platform == 4 and slow_hint:
+                time.sleep(0.5)
+            super().connect()
+
+    monkeypatch.setattr(sim_pydaq, 'Control', RecordControl)
+    slow_hint = False
+    daq.connect()
+    assert daq._control._platform == 4
+    assert tried == [4]
+
+    # If the hint is slow, the lowest platform that connects wins
+    daq.disconnect()
+    tried.clear()
+    slow_hint = True
+    monkeypatch.setattr(daq_module, 'CONNECT_HINT_TIMEOUT', 0.1)
+    monkeypatch.setattr(sim_pydaq, 'conn_platform', None)
+    daq.connect()
+    assert daq._control._platform == 0
+    assert sorted(tried) == list(range(6))
+    assert daq_module.load_hints(daq._host) == dict(platform=0)
+
+
+def test_connect_teardown(daq, monkeypatch):
+    logger.debug('test_connect_teardown')
+    controls = []
+
+    class RecordControl(sim_pydaq.Control):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            controls.append(self)
+
+    monkeypatch.setattr(sim_pydaq, 'Control', RecordControl)
+    daq.connect()
+    assert len(controls) == len(daq_module.PLATFORMS)
+    # Everything that lost the race should be disconnected
+    losers = [ctrl for ctrl in controls if ctrl is not daq._control]
+    start = time.time()
+    while time.time() - start < 1:
+        if all(ctrl.state() == 0 for ctrl in losers):
+            break
+        time.sleep(0.01)
+    assert all(ctrl.state() == 0 for ctrl in losers)
+    assert daq.state == 'Connected'
+
+
 def test_disconnect(daq):
     """
     We expect disconnect to bring the daq from a connected state to a
@@ -537,3 +603,588 @@ def test_timeouts(daq, monkeypatch):
         daq.begin(duration=1)
     daq.stop()
 
+
+def test_state_cache(daq, monkeypatch):
+    logger.debug('test_state_cache')
+    daq.connect()
+    calls = []
+    state = daq._control.state
+
+    def counting_state():
+        calls.append(1)
+        return state()
+
+    monkeypatch.setattr(daq._control, 'state', counting_state)
+    monkeypatch.setattr(daq_module, 'STATE_CACHE_TIMEOUT', 10)
+    assert daq.state == 'Connected'
+    assert daq.state == 'Connected'
+    assert len(calls) == 1
+    # Transitions we request update the cache without asking the daq
+    daq.configure(events=120)
+    assert daq.state == 'Configured'
+    daq.begin(events=1200)
+    assert daq.state == 'Running'
+    daq.stop()
+    assert daq.state == 'Open'
+    daq.end_run()
+    assert daq.state == 'Configured'
+    assert len(calls) == 1
+    # An explicit refresh always asks
+    assert daq.refresh_state() == 'Configured'
+    assert len(calls) == 2
+    daq.disconnect()
+    assert daq.state == 'Disconnected'
+
+
+@pytest.mark.timeout(10)
+def test_worker_thread(daq, RE, monkeypatch):
+    logger.debug('test_worker_thread')
+    daq.configure(events=1)
+    daq.connect()
+    threads = set()
+    begin = daq._control.begin
+    end = daq._control.end
+
+    def record_begin(*args, **kwargs):
+        threads.add(threading.current_thread())
+        return begin(*args, **kwargs)
+
+    def record_end(*args, **kwargs):
+        threads.add(threading.current_thread())
+        return end(*args, **kwargs)
+
+    monkeypatch.setattr(daq._control, 'begin', record_begin)
+    monkeypatch.setattr(daq._control, 'end', record_end)
+    RE(count([daq], num=10))
+    # Every begin and end ran on the same long-lived worker
+    assert len(threads) == 1
+    assert threads.pop() is not threading.current_thread()
+
+
+@pytest.mark.timeout(10)
+def test_wait_for_ready(daq, monkeypatch):
+    logger.debug('test_wait_for_ready')
+    daq.connect()
+    daq.configure()
+    monkeypatch.setattr(daq_module, 'STATE_CACHE_TIMEOUT', 10)
+    daq.begin(duration=10)
+
+    def finish_run():
+        time.sleep(0.2)
+        daq.stop()
+
+    start = time.time()
+    Thread(target=finish_run, args=()).start()
+    # We should wake up on the transition, not the cache timeout
+    assert daq._wait_for_ready(5) == 'Open'
+    assert time.time() - start < 1
+    daq.end_run()
+    # Give up at the timeout if nothing happens
+    daq._set_state('Running')
+    start = time.time()
+    assert daq._wait_for_ready(0.2) == 'Running'
+    assert 0.2 <= time.time() - start < 1
+
+
+class LaggyControl(sim_pydaq.Control):
+    """
+    Reports ``Running`` for a while after a stop, like the real daq can.
+    """
+    lag = 0.3
+
+    def stop(self):
+        super().stop()
+        self._stop_time = time.time()
+
+    def state(self):
+        stop_time = getattr(self, '_stop_time', 0)
+        if self._state == 'Open' and time.time() - stop_time < self.lag:
+            return self._all_states.index('Running')
+        return super().state()
+
+
+@pytest.mark.timeout(10)
+def test_wait_for_ready_lag(daq, monkeypatch):
+    logger.debug('test_wait_for_ready_lag')
+    monkeypatch.setattr(sim_pydaq, 'Control', LaggyControl)
+    monkeypatch.setattr(daq_module, 'BEGIN_THROTTLE', 0)
+    daq.connect()
+    daq.configure()
+    daq.begin(duration=10)
+    daq.stop()
+    # The cache says Open, but we wait until the daq agrees
+    start = time.time()
+    assert daq._wait_for_ready(5) == 'Open'
+    assert time.time() - start >= 0.2
+
+
+@pytest.mark.timeout(30)
+def test_adaptive_throttle(daq, monkeypatch, tmp_path):
+    logger.debug('test_adaptive_throttle')
+    monkeypatch.setattr(daq_module, 'HINTS_FILE', str(tmp_path / 'hints'))
+    monkeypatch.setattr(daq_module, 'BEGIN_THROTTLE', 0.5)
+    monkeypatch.setattr(daq_module, 'THROTTLE_STREAK', 1)
+    monkeypatch.setattr(daq_module, 'THROTTLE_DECREASE', 0.5)
+    daq.connect()
+    daq._control._stop_begin_gap = 0.2
+    assert daq.begin_throttle == 0.5
+    for i in range(8):
+        daq.begin(events=1000)
+        daq.stop()
+    # We found the gap without ever failing a begin, and never went over
+    # the cap
+    assert 0.2 < daq.begin_throttle <= 0.5
+    assert any(not ok for _, _, ok in daq._throttle.history)
+    hints = daq_module.load_hints(daq._host)
+    assert hints['begin_throttle'] == daq.begin_throttle
+
+    # Manual override
+    daq.begin_throttle = 0
+    assert daq.begin_throttle == 0
+    daq._control._stop_begin_gap = 0
+    start = time.time()
+    daq.begin(events=1000)
+    assert time.time() - start < 0.2
+    daq.begin_throttle = None
+    assert daq.begin_throttle == hints['begin_throttle']
+
+
+class SlowDummy:
+    name = 'slow'
+
+    @property
+    def position(self):
+        time.sleep(0.3)
+        return 4
+
+
+class HungDummy:
+    name = 'hung'
+    release = threading.Event()
+
+    @property
+    def position(self):
+        HungDummy.release.wait(timeout=10)
+        return 4
+
+
+@pytest.mark.timeout(10)
+def test_pipeline(daq, monkeypatch):
+    logger.debug('test_pipeline')
+    daq.configure(events=1000, controls=[SlowDummy()])
+    begin_args = []
+    begin = daq._control.begin
+    stop = daq._control.stop
+
+    def record_begin(*args, **kwargs):
+        begin_args.append(kwargs)
+        return begin(*args, **kwargs)
+
+    def slow_stop():
+        time.sleep(0.3)
+        stop()
+
+    monkeypatch.setattr(daq._control, 'begin', record_begin)
+    monkeypatch.setattr(daq._control, 'stop', slow_stop)
+    daq.begin()
+
+    # Without the pipeline, we read the controls after stopping
+    start = time.time()
+    daq.begin()
+    assert time.time() - start >= 0.6
+    assert begin_args[-1]['controls'] == [('slow', 4)]
+
+    # With the pipeline, we read the controls while stopping
+    daq.pipeline = True
+    start = time.time()
+    daq.begin()
+    assert time.time() - start < 0.55
+    assert begin_args[-1]['controls'] == [('slow', 4)]
+
+
+@pytest.mark.timeout(10)
+def test_ctrl_arg(daq, monkeypatch, sig):
+    logger.debug('test_ctrl_arg')
+    sig.put(3)
+    controls = dict(a=SlowDummy(), b=sig, c=Dummy(), d=SlowDummy())
+    start = time.time()
+    assert daq._ctrl_arg(controls) == [('a', 4), ('b', 3), ('c', 4),
+                                       ('d', 4)]
+    # The slow devices are read at the same time
+    assert time.time() - start < 0.5
+
+    monkeypatch.setattr(daq_module, 'CONTROLS_TIMEOUT', 0.1)
+    with pytest.raises(DaqTimeoutError) as exc_info:
+        daq._ctrl_arg([sig, SlowDummy()])
+    assert 'slow' in str(exc_info.value)
+
+    # The timeout is for all of the reads together, not for each one
+    monkeypatch.setattr(daq_module, 'CONTROLS_TIMEOUT', 0.45)
+    start = time.time()
+    with pytest.raises(DaqTimeoutError):
+        daq._ctrl_arg([SlowDummy(), SlowDummy(), HungDummy()])
+    assert time.time() - start < 0.55
+
+    # Hung reads don't hold up later reads
+    with pytest.raises(DaqTimeoutError):
+        daq._ctrl_arg([HungDummy() for i in range(20)])
+    assert daq._ctrl_arg((sig, SlowDummy())) == [('test', 3), ('slow', 4)]
+    HungDummy.release.set()
+
+
+def test_ctrl_subscriptions(daq, monkeypatch, sig, mot):
+    logger.debug('test_ctrl_subscriptions')
+    sig.put(1)
+    daq.configure(controls=dict(sig=sig, mot=mot, dummy=Dummy()))
+    assert id(sig) in daq._ctrl_subs
+    # Dummy can't be subscribed to
+    assert daq.stale_controls() == ['dummy']
+
+    def no_reads(device):
+        raise AssertionError('Read {} directly'.format(device))
+
+    sig.put(2)
+    mot.set(3)
+    monkeypatch.setattr(daq_module, '_read_control', no_reads)
+    assert daq._ctrl_arg(dict(sig=sig, mot=mot)) == [('sig', 2), ('mot', 3)]
+
+    # Stale values get read directly
+    monkeypatch.undo()
+    monkeypatch.setattr(daq_module, 'CONTROLS_STALE_TIME', 0)
+    time.sleep(0.01)
+    assert sorted(daq.stale_controls()) == ['dummy', 'mot', 'sig']
+    monkeypatch.setattr(daq_module, '_read_control', lambda dev: 5)
+    assert daq._ctrl_arg([sig]) == [('test', 5)]
+
+    # Reconfigure and disconnect drop the subscriptions
+    daq.configure(controls=[sig])
+    assert id(mot) not in daq._ctrl_subs
+    daq.disconnect()
+    assert not daq._ctrl_subs
+
+    # So does a failed configure
+    def bad_configure(*args, **kwargs):
+        raise RuntimeError('Configure failed')
+
+    daq.connect()
+    monkeypatch.setattr(daq._control, 'configure', bad_configure)
+    with pytest.raises(RuntimeError):
+        daq.configure(controls=[sig, mot])
+    assert not daq._ctrl_subs
+
+
+@pytest.mark.timeout(10)
+def test_run_number_tracking(daq, monkeypatch):
+    logger.debug('test_run_number_tracking')
+    calls = []
+    sim_run_number = ext.get_run_number
+
+    def slow_run_number(*args, **kwargs):
+        # The script reports the run number from when it was called
+        calls.append(1)
+        run_number = sim_run_number(*args, **kwargs)
+        time.sleep(0.5)
+        return run_number
+
+    monkeypatch.setattr(ext, 'get_run_number', slow_run_number)
+    start_num = sim_pydaq.Control._run_number
+    for i in range(3):
+        start = time.time()
+        daq.begin(events=1, record=True)
+        # The run number script is not on the begin path
+        assert time.time() - start < 0.4
+        daq.end_run()
+    # Wait for the background checks to finish
+    start = time.time()
+    while daq._run_number_pending and time.time() - start < 5:
+        time.sleep(0.1)
+    assert daq._last_run == start_num + 3
+    assert len(calls) < 4
+
+
+@pytest.mark.timeout(10)
+def test_run_number_slow_seed(daq, monkeypatch, caplog):
+    logger.debug('test_run_number_slow_seed')
+    sim_run_number = ext.get_run_number
+    seeded = threading.Event()
+
+    def slow_run_number(*args, **kwargs):
+        run_number = sim_run_number(*args, **kwargs)
+        seeded.wait(timeout=5)
+        return run_number
+
+    monkeypatch.setattr(ext, 'get_run_number', slow_run_number)
+    start_num = sim_pydaq.Control._run_number
+    # The seed finishes after the first begin, with the older run number
+    daq.begin(events=1, record=True)
+    daq.end_run()
+    seeded.set()
+    start = time.time()
+    while daq._last_run is None and time.time() - start < 5:
+        time.sleep(0.1)
+    assert daq._last_run == start_num + 1
+    caplog.clear()
+    with caplog.at_level(logging.INFO):
+        daq.begin(events=1, record=True)
+    daq.end_run()
+    assert 'Beginning daq run {}'.format(start_num + 2) in caplog.text
+
+
+@pytest.mark.timeout(10)
+def test_run_number_begin_during_seed(daq, monkeypatch):
+    logger.debug('test_run_number_begin_during_seed')
+    sim_hutch_name = ext.hutch_name
+
+    def slow_hutch_name(*args, **kwargs):
+        time.sleep(0.3)
+        return sim_hutch_name(*args, **kwargs)
+
+    monkeypatch.setattr(ext, 'hutch_name', slow_hutch_name)
+    start_num = sim_pydaq.Control._run_number
+    # The begin lands before the seed picks a lookup, so the seed is live
+    daq.begin(events=1000, record=True)
+    start = time.time()
+    while daq._last_run is None and time.time() - start < 5:
+        time.sleep(0.05)
+    daq.end_run()
+    assert daq._last_run == start_num + 1
+
+
+@pytest.mark.timeout(30)
+def test_async_api(daq, sig):
+    logger.debug('test_async_api')
+    loop = asyncio.new_event_loop()
+    states = []
+
+    async def watch(stream):
+        async for state in stream:
+            states.append(state)
+            if state == 'Disconnected':
+                break
+
+    async def run():
+        await daq.aconnect()
+        assert daq.connected
+        stream = daq.state_stream()
+        states.append(await stream.__anext__())
+        watcher = asyncio.ensure_future(watch(stream))
+        await daq.aconfigure(events=12, record=False, controls=[sig])
+        assert daq.config['events'] == 12
+        await daq.abegin()
+        assert daq.state == 'Running'
+        await daq.aend(timeout=5)
+        assert daq.state == 'Open'
+        await daq.abegin(wait=True, end_run=True)
+        assert daq.state == 'Configured'
+        await daq.abegin(duration=10)
+        with pytest.raises(DaqTimeoutError):
+            await daq.aend(timeout=0.1)
+        await daq.astop()
+        assert daq.state == 'Open'
+        await daq.aend_run()
+        await daq.adisconnect()
+        await asyncio.wait_for(watcher, 5)
+
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+    assert states == ['Connected', 'Configured', 'Running', 'Open',
+                      'Running', 'Open', 'Configured', 'Running', 'Open',
+                      'Configured', 'Disconnected']
+
+
+@pytest.mark.timeout(10)
+def test_state_stream_closed_loop(daq):
+    logger.debug('test_state_stream_closed_loop')
+    daq.connect()
+    loop = asyncio.new_event_loop()
+    stream = daq.state_stream()
+    try:
+        assert loop.run_until_complete(stream.__anext__()) == 'Connected'
+    finally:
+        loop.close()
+    assert daq._state_listeners
+    # A stream whose loop is gone must not break the daq
+    daq.configure(events=1)
+    assert not daq._state_listeners
+    daq.begin(wait=True)
+    daq.stop()
+    daq.end_run()
+    assert daq.state == 'Configured'
+
+
+@pytest.mark.timeout(30)
+def test_timing_report(daq, sig, caplog):
+    logger.debug('test_timing_report')
+    daq.connect()
+    daq.configure(events=12, controls=[sig])
+    seen = []
+    daq.timing_hook = lambda phase, duration, ts: seen.append(phase)
+    for i in range(3):
+        daq.begin(wait=True)
+    daq.end_run()
+    report = daq.timing_report()
+    for phase in ('configure', 'wait_ready', 'readback', 'begin',
+                  'begin_sleep', 'end', 'stop_to_begin'):
+        assert phase in report
+    assert report['begin']['count'] == 3
+    # No stop before the first begin
+    assert report['stop_to_begin']['count'] == 2
+    stats = report['end']
+    assert 0 <= stats['p50'] <= stats['p90'] <= stats['p99'] <= stats['max']
+    assert set(seen) == set(report) - {'configure'}
+    assert daq._timings.maxlen == daq_module.TIMING_HISTORY
+    # Broken hooks don't break the daq, and the log hook logs
+    daq.timing_hook = lambda *args: 1/0
+    daq.begin(wait=True)
+    daq.timing_hook = daq_module.log_timing
+    with caplog.at_level(logging.INFO):
+        daq.begin(wait=True)
+    assert 'Daq begin took' in caplog.text
+    daq.clear_timings()
+    assert daq.timing_report() == {}
+
+
+@pytest.mark.timeout(10)
+def test_sim_zero_latency(daq):
+    logger.debug('test_sim_zero_latency')
+    sim_pydaq.zero_latency = True
+    daq.configure(events=1200)
+    start = time.time()
+    for i in range(5):
+        daq.begin(wait=True)
+    assert time.time() - start < 1
+    assert daq.state == 'Open'
+    # Infinite runs still run until stopped
+    daq.begin_infinite()
+    assert daq.state == 'Running'
+    daq.stop()
+
+
+@pytest.mark.timeout(10)
+def test_sim_clock(daq):
+    logger.debug('test_sim_clock')
+    # Runs end exactly on a manual clock
+    clock = ManualClock(start=100)
+    sim_pydaq.clock = clock
+    daq.configure(events=120)
+    daq.begin()
+    clock.advance(0.999)
+    time.sleep(0.1)
+    assert daq.refresh_state() == 'Running'
+    clock.advance(0.001)
+    daq.wait(timeout=1)
+    assert daq.refresh_state() == 'Open'
+    assert daq._control._last_stop == 101
+    # Stops interrupt the wait without moving the clock
+    daq.begin()
+    daq.stop()
+    assert daq.refresh_state() == 'Open'
+    # A long run goes by quickly on a fast clock
+    sim_pydaq.clock = VirtualClock(speed=1000)
+    daq.end_run()
+    daq.configure(events=12000)
+    start = time.time()
+    daq.begin(wait=True)
+    assert time.time() - start < 1
+    assert daq.refresh_state() == 'Open'
+
+
+@pytest.mark.timeout(10)
+def test_sim_many_controls(daq):
+    logger.debug('test_sim_many_controls')
+    threads = threading.active_count()
+    controls = [sim_pydaq.Control() for i in range(300)]
+    for i, control in enumerate(controls):
+        control._state = 'Connected'
+        control.configure(events=12 + i % 3)
+        control.begin(events=12 + i % 3)
+    # Every run ends from the one scheduler thread
+    assert threading.active_count() <= threads + 1
+    for control in controls:
+        assert control._done_flag.wait(timeout=2)
+        assert control._state == 'Open'
+    # Runs end in deadline order on a manual clock, and stops cancel them
+    clock = ManualClock(start=time.time())
+    sim_pydaq.clock = clock
+    for i, control in enumerate(controls[:3]):
+        control.begin(events=120 * (i + 1))
+    controls[2].stop()
+    controls[2].begin(events=1200)
+    clock.advance(1.5)
+    assert controls[0]._done_flag.wait(timeout=2)
+    time.sleep(0.1)
+    assert [c._state for c in controls[:3]] == ['Open', 'Running',
+                                                'Running']
+    clock.advance(1)
+    assert controls[1]._done_flag.wait(timeout=2)
+    time.sleep(0.1)
+    assert controls[2]._state == 'Running'
+    clock.advance(10)
+    assert controls[2]._done_flag.wait(timeout=2)
+
+
+def test_daq_registry(daq, RE, monkeypatch):
+    logger.debug('test_daq_registry')
+    monkeypatch.setattr(daq_module, '_daq_instance', None)
+    monkeypatch.setattr(daq_module, '_daq_instances', {})
+    daq_a = Daq(RE=RE, name='daq_a', platform=1)
+    daq_b = Daq(RE=RE, name='daq_b', platform=2)
+    # The first daq stays the default
+    assert daq_module.get_daq() is daq_a
+    assert daq_module.get_daq('daq_b') is daq_b
+    assert daq_module.get_daq('nope') is None
+    assert daq_module.get_daqs() == [daq_a, daq_b]
+    # A daq with the same name replaces the old one
+    daq_a2 = Daq(RE=RE, name='daq_a')
+    assert daq_module.get_daq() is daq_a2
+    assert daq_module.get_daqs() == [daq_a2, daq_b]
+    # A pinned platform is the only one tried
+    daq_b.connect()
+    assert daq_b._control._platform == 2
+    monkeypatch.setattr(sim_pydaq, 'conn_platform', 3)
+    daq_a.connect()
+    assert not daq_a.connected
+
+
+@pytest.mark.timeout(20)
+def test_daq_group(daq, RE, monkeypatch):
+    logger.debug('test_daq_group')
+    monkeypatch.setattr(daq_module, '_daq_instance', None)
+    monkeypatch.setattr(daq_module, '_daq_instances', {})
+    daqs = [Daq(RE=RE, name='daq{}'.format(i), platform=i) for i in range(2)]
+    group = DaqGroup(daqs)
+    with pytest.raises(ValueError):
+        DaqGroup([daqs[0], Daq(RE=RE, name='daq0')])
+    with pytest.raises(ValueError):
+        DaqGroup([])
+    try:
+        old, new = group.configure(events=12, record=False)
+        assert new['daq0_events']['value'] == 12
+        assert new['daq1_events']['value'] == 12
+        assert set(group.describe_configuration()) == set(new)
+        assert group.state == dict(daq0='Configured', daq1='Configured')
+
+        group.begin()
+        assert group.state == dict(daq0='Running', daq1='Running')
+        group.wait(timeout=5)
+        assert group.state == dict(daq0='Open', daq1='Open')
+        group.end_run()
+
+        # Flyer: one status for all of the daqs
+        status_wait(group.kickoff(events=24), timeout=5)
+        assert group.state == dict(daq0='Running', daq1='Running')
+        end_status = group.complete()
+        status_wait(end_status, timeout=5)
+        assert all(daq.state == 'Open' for daq in daqs)
+        assert list(group.collect()) == []
+        group.end_run()
+
+        # Errors from any daq are raised after every daq is done
+        daqs[1].begin_infinite()
+        with pytest.raises(RuntimeError):
+            group.wait()
+        assert group.state == dict(daq0='Configured', daq1='Running')
+    finally:
+        group.end_run()
@@ -3,6 +3,7 @@ import logging
 import pytest
 import socket
 import subprocess
+import time
 
 import pcdsdaq.ext_scripts as ext
 
@@ -67,3 +68,67 @@ def test_get_ami_proxy(monkeypatch):
     monkeypatch.setattr(socket, 'gethostbyaddr', fake_gethostbyaddr)
 
     assert ext.get_ami_proxy('tst') == 'tst-amiproxy'
+
+
+def test_script_cache(monkeypatch):
+    logger.debug('test_script_cache')
+    calls = []
+
+    def fake_script(args, **kwargs):
+        calls.append(args)
+        return str(len(calls))
+
+    monkeypatch.setattr(ext, 'call_script', fake_script)
+    cache = ext.ScriptCache(maxsize=2)
+
+    # Never expires
+    assert cache.get(['a']) == '1'
+    assert cache.get(['a']) == '1'
+    assert len(calls) == 1
+
+    # Expires right away, no stale values
+    assert cache.get(['b'], ttl=0) == '2'
+    assert cache.get(['b'], ttl=0) == '3'
+    assert len(calls) == 3
+
+    # Stale value is returned while we refresh in the background
+    assert cache.get(['b'], ttl=0, stale_ttl=None) == '3'
+    start = time.time()
+    while cache.stats()['refreshes'] < 1 and time.time() - start < 1:
+        time.sleep(0.01)
+    assert cache.get(['b'], ttl=10) == '4'
+
+    # LRU eviction, 'a' is the oldest
+    cache.get(['c'])
+    assert len(cache) == 2
+    cache.get(['b'], ttl=10)
+    assert len(calls) == 5
+
+    stats = cache.stats()
+    assert stats['hits'] == 3
+    assert stats['stale_hits'] == 1
+    assert stats['misses'] == 4
+    assert stats['refreshes'] == 1
+    assert stats['evictions'] == 1
+    assert stats['size'] == 2
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_run_number_cached(nosim, monkeypatch):
+    logger.debug('test_run_number_cached')
+    ext.clear_script_cache()
+    calls = []
+
+    def fake_run_number(*args, **kwargs):
+        calls.append(args)
+        return '1\n'
+
+    monkeypatch.setattr(ext, 'call_script', fake_run_number)
+    monkeypatch.setattr(ext, 'RUN_NUMBER_TTL', 10)
+    assert ext.get_run_number(hutch='tst') == 1
+    assert ext.get_run_number(hutch='tst') == 1
+    assert len(calls) == 1
+    assert ext.script_cache_stats()['hits'] >= 1
+    ext.clear_script_cache()
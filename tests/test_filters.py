@@ -0,0 +1,83 @@
+import logging
+
+import numpy as np
+import pytest
+
+from pcdsdaq.filters import (And, Or, Range, EventCode, parse_filter,
+                             pass_rate, expected_duration)
+
+logger = logging.getLogger(__name__)
+
+
+def test_filter_render():
+    logger.debug('test_filter_render')
+    assert Range('DET', 0, 1).render() == '0<DET<1'
+    assert EventCode(162).render() == '0.1<DAQ:EVR:Evt162<2'
+    filt = Or(And(Range('DET', 0, 1), EventCode(40)), EventCode(162))
+    assert str(filt) == ('((0<DET<1)&(0.1<DAQ:EVR:Evt40<2))'
+                         '|(0.1<DAQ:EVR:Evt162<2)')
+
+
+def test_filter_canonical():
+    logger.debug('test_filter_canonical')
+    one = Range('A', 0, 1)
+    two = Range('B', 2, 3)
+    three = EventCode(162)
+    # Flatten, dedupe, and sort
+    filt = And(And(two, one), one, three)
+    assert filt.canonical().render() == ('(0<A<1)&(2<B<3)'
+                                         '&(0.1<DAQ:EVR:Evt162<2)')
+    assert filt == And(three, one & two)
+    assert hash(filt) == hash(And(three, one & two))
+    assert filt != Or(one, two, three)
+    assert And(one, one).canonical() is one
+    assert Range('A', 0, 1) == Range('A', 0.0, 1.0)
+    assert Range('A', 0.0, 1.0).render() == '0<A<1'
+    assert (And(Range('A', 0, 1.5), two).canonical().render()
+            == And(two, Range('A', 0.0, 1.5)).canonical().render())
+    cache = {filt: 'value'}
+    assert cache[(one & three) & two] == 'value'
+
+
+def test_parse_filter():
+    logger.debug('test_parse_filter')
+    text = '((0<DET<1)&(0.1<DAQ:EVR:Evt162<2))|(0.1<DAQ:EVR:Evt162<2)'
+    filt = parse_filter(text)
+    assert filt.render() == text
+    assert filt == Or(EventCode(162), Range('DET', 0, 1) & EventCode(162))
+    assert parse_filter(' 4 < x < 5.5 ') == Range('x', 4, 5.5)
+    assert parse_filter('(0<A<1)&(0<B<1)&(0<C<1)') == And(
+        Range('C', 0, 1), Range('B', 0, 1), Range('A', 0, 1))
+    for bad in ('0<A', '(0<A<1', '(0<A<1)&(0<B<1)|(0<C<1)', '0<A<1)',
+                'a<A<1'):
+        with pytest.raises(ValueError):
+            parse_filter(bad)
+
+
+def test_filter_evaluate():
+    logger.debug('test_filter_evaluate')
+    data = {'A': [0.5, 2, 0.5, 2], 'B': [0, 0, 3, 3]}
+    codes = {162: [True, False, False, True]}
+    filt = Range('A', 0, 1) | EventCode(162)
+    assert list(filt.evaluate(data, event_codes=codes)) == [True, False,
+                                                            True, True]
+    # Missing event codes never pass, missing detectors are an error
+    assert not filt.evaluate(data).tolist()[1]
+    assert filt.evaluate(data).tolist() == [True, False, True, False]
+    with pytest.raises(KeyError):
+        Range('C', 0, 1).evaluate(data)
+    with pytest.raises(ValueError):
+        filt.evaluate({'A': [1, 2], 'B': [1]})
+    text = '((0<A<1)&(2<B<4))|(0.1<DAQ:EVR:Evt162<2)'
+    assert pass_rate(text, data, event_codes=codes) == 0.75
+    assert pass_rate(text, data) == 0.25
+    assert np.isnan(pass_rate(text, {'A': [], 'B': []}))
+
+
+def test_expected_duration():
+    logger.debug('test_expected_duration')
+    data = {'A': (np.arange(100) + 0.5) / 100}
+    assert expected_duration('0<A<0.5', 120, data) == pytest.approx(2)
+    assert expected_duration(Range('A', 0, 0.5), 60, data,
+                             rate=60) == pytest.approx(2)
+    assert expected_duration('2<A<3', 120, data) == np.inf
@@ -5,6 +5,8 @@ from bluesky.plan_stubs import (trigger_and_read,
                                 create, read, save, null)
 from bluesky.preprocessors import run_decorator
 
+import pcdsdaq.daq as daq_module
+from pcdsdaq.daq import Daq
 from pcdsdaq.preprocessors import daq_during_wrapper, daq_during_decorator
 
 logger = logging.getLogger(__name__)
@@ -58,3 +60,29 @@ def test_post_daq_RE(daq, RE, sig):
     RE(daq_during_wrapper(plan(sig, 'Running')))
     RE(plan(sig, 'Configured'))
     assert daq.state == 'Configured'
+
+
+@pytest.mark.timeout(20)
+def test_flyer_scan_daqs(daq, RE, sig, monkeypatch):
+    """
+    We expect to be able to run several daqs with the decorator
+    """
+    logger.debug('test_flyer_scan_daqs')
+    # Keep daq2 out of the registry seen by the other tests
+    monkeypatch.setattr(daq_module, '_daq_instance',
+                        daq_module._daq_instance)
+    monkeypatch.setattr(daq_module, '_daq_instances',
+                        dict(daq_module._daq_instances))
+    daq2 = Daq(RE=RE, name='daq2', platform=1)
+
+    @daq_during_decorator(daqs=[daq, daq2])
+    @run_decorator()
+    def plan(reader):
+        for i in range(3):
+            assert daq.state == 'Running'
+            assert daq2.state == 'Running'
+            yield from trigger_and_read([reader])
+
+    RE(plan(sig))
+    assert daq.state == 'Configured'
+    assert daq2.state == 'Configured'